@@ -0,0 +1,118 @@
+import json
+import os
+
+import pygame
+
+ATLAS_IMAGE = "atlas.png"
+ATLAS_INDEX = "atlas.json"
+
+# Every sprite size the game modes draw, derived from their shared 600 px / 21 cell layout
+CELL_SIZE = 600 // 21
+AVATARS = ["girl-1.png", "girl-2.png", "boy-1.png", "boy-2.png",
+           "girl-p2-1.png", "girl-p2-2.png", "boy-p2-1.png", "boy-p2-2.png"]
+SPRITES = {
+    "treasure.png": [CELL_SIZE, CELL_SIZE + 10, int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.5)],
+    "enemy.png": [int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.5)],
+    "key.png": [CELL_SIZE],
+    "lock.png": [CELL_SIZE],
+}
+for avatar in AVATARS:
+    SPRITES[avatar] = [CELL_SIZE + 10, 100]
+SPRITES["girl-1.png"] += [int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.5)]
+
+
+def sprite_key(name, size):
+    return f"{name}@{size[0]}x{size[1]}"
+
+
+def build_atlas(sprites=SPRITES, image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX, width=512):
+    """ Pre-bakes every sprite at its game sizes into one PNG plus a JSON index.
+
+    Sprites are placed with simple shelf packing, tallest first.
+    """
+    scaled = []
+    for name, sizes in sprites.items():
+        source = pygame.image.load(name)
+        for side in sorted(set(sizes)):
+            scaled.append((sprite_key(name, (side, side)), pygame.transform.scale(source, (side, side))))
+        del source  # Only the small copies are kept
+    scaled.sort(key=lambda item: -item[1].get_height())
+
+    index = {}
+    x = y = shelf_height = 0
+    for key, image in scaled:
+        w, h = image.get_size()
+        if x + w > width:
+            x, y = 0, y + shelf_height
+            shelf_height = 0
+        index[key] = [x, y, w, h]
+        x += w
+        shelf_height = max(shelf_height, h)
+
+    atlas = pygame.Surface((width, y + shelf_height), pygame.SRCALPHA)
+    for key, image in scaled:
+        atlas.blit(image, index[key][:2])
+    pygame.image.save(atlas, image_path)
+    with open(index_path, "w") as file:
+        json.dump(index, file, indent=1, sort_keys=True)
+    return index
+
+
+class Atlas:
+    """ Lazily loaded sprite atlas.
+
+    Nothing is read from disk until the first sprite is requested; the atlas
+    image is then decoded and converted once, and sprites are subsurfaces of
+    it. A size missing from the index (or a missing atlas) falls back to
+    loading and scaling the source PNG, cached so it happens once.
+    """
+
+    def __init__(self, image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX):
+        self.image_path = image_path
+        self.index_path = index_path
+        self.image = None
+        self.index = None
+        self.converted = False
+        self.sprites = {}
+
+    def load(self):
+        """ Decodes the atlas; safe to call early (e.g. in a pre-warmed worker) before any window exists. """
+        self.index = {}
+        if os.path.exists(self.image_path) and os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                self.index = json.load(file)
+            self.image = pygame.image.load(self.image_path)
+
+    def convert(self):
+        """ Converts the atlas to the display format once a window is open. """
+        if self.image is not None and not self.converted and pygame.display.get_surface() is not None:
+            self.image = self.image.convert_alpha()
+            self.converted = True
+            self.sprites = {}  # Subsurfaces of the unconverted image are stale
+
+    def sprite(self, name, size):
+        """ The sprite file `name` scaled to `size`, as a shared surface. """
+        if self.index is None:
+            self.load()
+        if not self.converted:
+            self.convert()
+        key = sprite_key(name, size)
+        surface = self.sprites.get(key)
+        if surface is None:
+            rect = self.index.get(key)
+            if rect is not None:
+                surface = self.image.subsurface(pygame.Rect(rect))
+            else:
+                surface = pygame.transform.scale(pygame.image.load(name), size)
+                if pygame.display.get_surface() is not None:
+                    surface = surface.convert_alpha()
+            self.sprites[key] = surface
+        return surface
+
+
+atlas = Atlas()
+
+if __name__ == "__main__":
+    pygame.init()
+    built = build_atlas()
+    print(f"Packed {len(built)} sprites into {ATLAS_IMAGE}")
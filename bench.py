@@ -0,0 +1,247 @@
+""" Benchmarks for maze generation, pathfinding and frame rendering.
+
+    python bench.py                          # full run, JSON on stdout
+    python bench.py --quick --output new.json
+    python bench.py --compare old.json       # flag regressions against a saved run
+
+Pathfinding is timed through the pathfinding functions the games call.
+The game modules run their game as soon as they are imported, so
+draw_maze is timed inside the real module under the SDL dummy video
+driver.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# The JSON report goes to stdout, so pygame must not print its banner there
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from maze import generate_maze
+from pathfinding import (DistanceField, JumpTable, PursuitPath, TreeIndex, bfs_path, bidirectional_bfs_path,
+                         jps_path, maze_kind, shortest_path)
+
+GENERATE_SIZES = [21, 101, 501, 1001]
+SEARCH_SIZES = [21, 101, 501]
+RENDER_SIZES = [21, 101, 501]
+BRAID_FRACTIONS = [0.1, 0.5, 1.0]
+GAME_MODULES = ['classical.py', 'easy_mode.py', 'hard_mode.py', 'friends.py']
+
+
+def timed(function, repeat):
+    """ Runs function `repeat` times; returns (best, median) seconds. """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': statistics.median(times), 'runs': repeat}
+
+
+def searchers(grid):
+    """ The pathfinders the game modes use, bound to one benchmark maze. """
+    return {
+        'bfs_path': lambda start, goal: bfs_path(grid, start, goal),
+        'shortest_path': lambda start, goal: shortest_path(grid, start, goal),
+        'PursuitPath': lambda start, goal: PursuitPath(grid, start, goal),  # hard and easy enemies
+        'DistanceField': lambda start, goal: DistanceField(grid, goal),  # swarm, hints, leaderboard
+    }
+
+
+def bench_generate(sizes, repeat):
+    results = {}
+    for size in sizes:
+        results[str(size)] = timed(lambda: generate_maze(size, size, seed=size), max(1, repeat // (1 + size // 200)))
+    return results
+
+
+def bench_search(sizes, repeat):
+    results = {}
+    for size in sizes:
+        grid = generate_maze(size, size, seed=size)
+        start, goal = (1, 1), (size - 2, size - 2)
+        runs = max(1, repeat // (1 + size // 100))
+        entry = {'index_build': timed(lambda: TreeIndex(grid), 1)}
+        grid.tree_index = TreeIndex(grid)
+        entry['loop_free'] = grid.tree_index.is_tree
+        for name, search in searchers(grid).items():
+            entry[name] = timed(lambda: search(start, goal), runs)
+        # The same searches with the tree fast path switched off
+        grid.tree_index.is_tree = False
+        grid.kind = None
+        for name, search in searchers(grid).items():
+            if name != 'DistanceField':  # Always a full BFS; nothing to switch off
+                entry[name + ':search'] = timed(lambda: search(start, goal), runs)
+        grid.tree_index = None
+        grid.kind = None
+        results[str(size)] = entry
+    return results
+
+
+def bench_braided(sizes, repeat):
+    """ The shared solvers on braided mazes, where the tree fast path no longer applies. """
+    results = {}
+    for size in sizes:
+        start, goal = (1, 1), (size - 2, size - 2)
+        runs = max(1, repeat // (1 + size // 100))
+        for braid in BRAID_FRACTIONS:
+            grid = generate_maze(size, size, seed=size, braid=braid)
+            results[f"{size}@{braid:g}"] = {
+                'kind': maze_kind(grid),
+                'jump_table_build': timed(lambda: JumpTable(grid), 1),
+                'bfs_path': timed(lambda: bfs_path(grid, start, goal), runs),
+                'bidirectional_bfs_path': timed(lambda: bidirectional_bfs_path(grid, start, goal), runs),
+                'jps_path': timed(lambda: jps_path(grid, start, goal), runs),
+            }
+    return results
+
+
+class StopBenchmark(Exception):
+    pass
+
+
+def find_game(namespace):
+    """ The running game's draw_maze and MazeLayer, from module globals or a MazeGame frame. """
+    if 'draw_maze' in namespace and 'maze_layer' in namespace:
+        return namespace['draw_maze'], namespace['maze_layer']
+    frame = sys._getframe(2)
+    while frame is not None:
+        game = frame.f_locals.get('self')
+        if hasattr(game, 'draw_maze') and hasattr(game, 'maze_layer'):
+            return game.draw_maze, game.maze_layer
+        frame = frame.f_back
+    return None
+
+
+def bench_module_frames(path, frames):
+    """ Times draw_maze + present inside a real game module under the dummy video driver. """
+    import pygame
+    namespace = {'__name__': '__main__', '__file__': path}
+    result = {}
+    real_get = pygame.event.get
+
+    def fake_get(*args, **kwargs):
+        real_get()
+        game = find_game(namespace)
+        if game is None:
+            # Get past start, avatar and countdown screens
+            return [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(300, 320), button=1),
+                    pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE)]
+        draw_maze, maze_layer = game
+        draw_maze()
+        maze_layer.present()  # First frame repaints the whole window
+        result.update(timed(lambda: (draw_maze(), maze_layer.present()), frames))
+        raise StopBenchmark
+
+    patches = [(pygame.event, 'get', fake_get), (time, 'sleep', lambda seconds: None),
+               (pygame.time, 'delay', lambda ms: None)]
+    saved = [(owner, name, getattr(owner, name)) for owner, name, _ in patches]
+    for owner, name, value in patches:
+        setattr(owner, name, value)
+    try:
+        with open(path) as file:
+            exec(compile(file.read(), path, 'exec'), namespace)
+    except (StopBenchmark, SystemExit):
+        pass
+    finally:
+        for owner, name, value in saved:
+            setattr(owner, name, value)
+    return result
+
+
+def bench_layer(sizes, frames):
+    """ MazeLayer build and per-frame cost for larger mazes in a 600x650 window. """
+    import pygame
+    from rendering import MazeLayer
+    screen = pygame.display.set_mode((600, 650))
+    results = {}
+    for size in sizes:
+        grid = generate_maze(size, size, seed=size)
+        cell_size = max(1, 600 // size)
+        build = timed(lambda: MazeLayer(grid, cell_size, 60, (600, 650), (240, 240, 240), (30, 30, 30), (240, 240, 240)), 1)
+        layer = MazeLayer(grid, cell_size, 60, (600, 650), (240, 240, 240), (30, 30, 30), (240, 240, 240))
+
+        def frame():
+            layer.begin_frame(screen)
+            layer.rect(screen, (237, 28, 36), layer.cell_rect((1, 1)))
+            layer.present()
+        frame()
+        results[str(size)] = {'build': build, 'frame': timed(frame, frames)}
+    return results
+
+
+def bench_render(sizes, frames):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import tkinter.messagebox
+    tkinter.messagebox.showinfo = lambda *args, **kwargs: None
+    results = {'modules': {}, 'layer': {}}
+    # Anything the game modules print would corrupt the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for path in GAME_MODULES:
+            results['modules'][path] = bench_module_frames(path, frames)
+        results['layer'] = bench_layer(sizes, frames)
+    return results
+
+
+def compare(old, new, threshold, prefix=''):
+    """ Lists timings that got slower than threshold (e.g. 0.2 for 20 %). """
+    slower = []
+    for key, value in new.items():
+        if key not in old:
+            continue
+        if isinstance(value, dict) and 'best' in value and isinstance(old[key], dict):
+            ratio = value['best'] / old[key]['best'] if old[key]['best'] else float('inf')
+            if ratio > 1 + threshold:
+                slower.append(f"{prefix}{key}: {old[key]['best'] * 1000:.3f} ms -> {value['best'] * 1000:.3f} ms ({ratio:.2f}x)")
+        elif isinstance(value, dict):
+            slower.extend(compare(old[key], value, threshold, f"{prefix}{key}."))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark maze generation, pathfinding and rendering.")
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--skip-render", action="store_true")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    generate_sizes = [21, 101] if args.quick else GENERATE_SIZES
+    search_sizes = [21, 101] if args.quick else SEARCH_SIZES
+    render_sizes = [21, 101] if args.quick else RENDER_SIZES
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'generate_maze': bench_generate(generate_sizes, args.repeat),
+        'pathfinding': bench_search(search_sizes, args.repeat),
+        'braided_pathfinding': bench_braided(search_sizes, args.repeat),
+    }
+    if not args.skip_render:
+        report['render'] = bench_render(render_sizes, args.frames)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            slower = compare(json.load(file), report, args.threshold)
+        for line in slower:
+            print("SLOWER", line, file=sys.stderr)
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,25 @@
 import pygame
-import random
 import time
 import tkinter as tk
 from tkinter import messagebox
+from maze_bank import choose_maze, maze_size
+from pathfinding import DistanceField
+from rendering import make_maze_layer
+from leaderboard import Leaderboard
+from replay import Replay, ReplayError
+from entities import EntityGrid, TREASURE
+from profiler import frame_profiler
+from sessions import report_result, WON, QUIT
 
 # Constants
 WIDTH, HEIGHT = 600, 650  # Space for UI
-ROWS, COLS = 21, 21  # Maze size
-CELL_SIZE = WIDTH // COLS
+ROWS = COLS = maze_size(21)  # Maze size; set $MAZE_SIZE for bigger mazes
+MIN_CELL_SIZE = 20  # Mazes that would need smaller cells scroll instead
+CELL_SIZE = max(WIDTH // COLS, MIN_CELL_SIZE)
 TOP_MARGIN = 60  # Space for UI elements
-SCORE_FILE = "scores.txt"
+SCORE_FILE = "scores.txt"  # Legacy scores, imported into SCORE_DB on first use
+SCORE_DB = "scores.db"
+TICK_RATE = 10  # Frames per second; replays count time in frames
 
 # Colors
 WHITE = (240, 240, 240)
@@ -24,73 +34,39 @@ pygame.init()
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Maze Game")
 clock = pygame.time.Clock()
+profiler = frame_profiler("classical")  # Off unless $MAZE_PROFILE is set
 font = pygame.font.SysFont("Arial", 30, bold=True)
 title_font = pygame.font.SysFont("Arial", 50, bold=True)
 
-DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+ARROW_KEYS = {pygame.K_UP: (-1, 0), pygame.K_DOWN: (1, 0), pygame.K_LEFT: (0, -1), pygame.K_RIGHT: (0, 1)}
 
-def generate_maze(rows, cols):
-    """ Generates a complex maze using Prim's Algorithm. """
-    grid = [[0 for _ in range(cols)] for _ in range(rows)]
-    start_x, start_y = 1, 1
-    grid[start_x][start_y] = 1
-    walls = [(start_x + dx, start_y + dy) for dx, dy in DIRECTIONS if 0 <= start_x + dx < rows and 0 <= start_y + dy < cols]
-    random.shuffle(walls)
-
-    while walls:
-        wx, wy = walls.pop()
-        if grid[wx][wy] == 0:
-            neighbors = [(wx + dx, wy + dy) for dx, dy in DIRECTIONS if 0 <= wx + dx < rows and 0 <= wy + dy < cols and grid[wx + dx][wy + dy] == 1]
-            if len(neighbors) == 1:
-                grid[wx][wy] = 1
-                for dx, dy in DIRECTIONS:
-                    nx, ny = wx + dx, wy + dy
-                    if 0 <= nx < rows and 0 <= ny < cols and grid[nx][ny] == 0:
-                        walls.append((nx, ny))
-        random.shuffle(walls)
-
-    grid[rows - 2][cols - 2] = 1
-    return grid
-
-def bfs_shortest_path(maze, start, end):
-    """ Finds the shortest path in the maze using BFS. """
-    queue = [(start, 0)]
-    visited = set([start])
-    while queue:
-        (x, y), steps = queue.pop(0)
-        if (x, y) == end:
-            return steps
-        for dx, dy in DIRECTIONS:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < ROWS and 0 <= ny < COLS and maze[nx][ny] == 1 and (nx, ny) not in visited:
-                queue.append(((nx, ny), steps + 1))
-                visited.add((nx, ny))
-    return float('inf')
-
-def save_score(time_taken, moves, optimal_moves):
-    """ Saves the score to a file. """
-    with open(SCORE_FILE, "a") as file:
-        file.write(f"{time_taken:.2f},{moves},{optimal_moves}\n")
+def save_score(replay):
+    """ Submits the run's replay to the shared leaderboard, which verifies it; returns the verified result. """
+    scores = Leaderboard(SCORE_DB, legacy_file=SCORE_FILE)
+    try:
+        return scores.record(replay)
+    finally:
+        scores.close()
 
 def get_top_scores():
-    """ Reads scores from file and returns top 5 performances. """
-    scores = []
-    try:
-        with open(SCORE_FILE, "r") as file:
-            for line in file:
-                time_taken, moves, optimal_moves = map(float, line.strip().split(','))
-                scores.append((moves, time_taken))
-        scores.sort()
-        return scores[:5]
-    except FileNotFoundError:
-        return []
+    """ Returns the top 5 performances on this maze size from the indexed leaderboard. """
+    scores = Leaderboard(SCORE_DB, legacy_file=SCORE_FILE)
+    top_scores = scores.top("classical", ROWS, COLS, 5)
+    scores.close()
+    return top_scores
 
-def show_popup(time_taken, moves, optimal_moves):
+def show_popup(replay, time_taken, moves, optimal_moves):
     """ Displays a message box with performance stats. """
-    save_score(time_taken, moves, optimal_moves)
+    try:
+        # The leaderboard's re-simulated numbers are the ones that count
+        verified = save_score(replay)
+        time_taken, moves = verified['seconds'], verified['moves']
+        note = ""
+    except ReplayError as error:
+        note = f"\n\nScore not saved: {error}"
     top_scores = get_top_scores()
     score_msg = "\n".join([f"{i+1}. Moves: {m}, Time: {t:.2f}s" for i, (m, t) in enumerate(top_scores)])
-    messagebox.showinfo("Game Over", f"You won!\nTime Taken: {time_taken:.2f}s\nMoves: {moves}\nOptimal Moves: {optimal_moves}\n\nTop Scores:\n{score_msg}")
+    messagebox.showinfo("Game Over", f"You won!\nTime Taken: {time_taken:.2f}s\nMoves: {moves}\nOptimal Moves: {optimal_moves}\nMoves Wasted: {moves - optimal_moves}\n\nTop Scores:\n{score_msg}{note}")
 
 # Start Screen
 def start_screen():
@@ -111,39 +87,68 @@ def start_screen():
                 return
 
 start_screen()
-maze = generate_maze(ROWS, COLS)
+maze = choose_maze(ROWS, COLS)
 treasure = (ROWS - 2, COLS - 2)
 player = (1, 1)
 start_time = time.time()
+end_time = None  # Set when the treasure is reached
 moves = 0
-optimal_moves = bfs_shortest_path(maze, (1, 1), treasure)
+# One BFS from the treasure answers optimal moves and hints for the whole game
+treasure_field = DistanceField(maze, treasure)
+optimal_moves = treasure_field.distance(player)
+show_hint = False
+entities = EntityGrid.for_maze(maze)
+entities.add(TREASURE, treasure)
+maze_layer = make_maze_layer(maze, CELL_SIZE, TOP_MARGIN, (WIDTH, HEIGHT), BG_GRADIENT[0], BLACK, WHITE)
+# Classical mode has no randomness beyond the maze, so the replay's rng seed is unused
+replay = Replay.for_game("classical", maze, 0, TICK_RATE)
+tick = 0
 
 def draw_maze():
-    screen.fill(BG_GRADIENT[0])
+    # Walls come from the cached layer; only sprites and HUD are redrawn
+    maze_layer.follow(player)
+    maze_layer.begin_frame(screen)
     elapsed_time = time.time() - start_time
-    screen.blit(font.render(f"Time: {elapsed_time:.2f}s", True, BLACK), (20, 15))
-    screen.blit(font.render(f"Moves: {moves}", True, BLACK), (WIDTH - 140, 15))
-    for x in range(ROWS):
-        for y in range(COLS):
-            rect = (y * CELL_SIZE, x * CELL_SIZE + TOP_MARGIN, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(screen, BLACK if maze[x][y] == 0 else WHITE, rect, border_radius=6)
-    pygame.draw.rect(screen, GREEN, (treasure[1] * CELL_SIZE, treasure[0] * CELL_SIZE + TOP_MARGIN, CELL_SIZE, CELL_SIZE), border_radius=8)
-    pygame.draw.rect(screen, RED, (player[1] * CELL_SIZE, player[0] * CELL_SIZE + TOP_MARGIN, CELL_SIZE, CELL_SIZE), border_radius=10)
+    maze_layer.blit(screen, font.render(f"Time: {elapsed_time:.2f}s", True, BLACK), (20, 15))
+    maze_layer.blit(screen, font.render(f"Moves: {moves}", True, BLACK), (WIDTH - 140, 15))
+    hint = treasure_field.next_step(player) if show_hint else None
+    if hint:
+        maze_layer.rect(screen, BLUE, maze_layer.cell_rect(hint), border_radius=10)
+    maze_layer.rect(screen, GREEN, maze_layer.cell_rect(treasure), border_radius=8)
+    maze_layer.rect(screen, RED, maze_layer.cell_rect(player), border_radius=10)
 
 running = True
 while running:
-    clock.tick(10)
+    profiler.begin_frame()
+    clock.tick(TICK_RATE)
+    tick += 1
+    profiler.mark("wait")
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
-        elif event.type == pygame.KEYDOWN:
-            dx, dy = {pygame.K_UP: (-1, 0), pygame.K_DOWN: (1, 0), pygame.K_LEFT: (0, -1), pygame.K_RIGHT: (0, 1)}.get(event.key, (0, 0))
-            if maze[player[0] + dx][player[1] + dy] == 1:
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+            show_hint = not show_hint  # Toggle the next-step hint
+        elif event.type == pygame.KEYDOWN and event.key in ARROW_KEYS:
+            dx, dy = ARROW_KEYS[event.key]
+            replay.record(tick, (dx, dy))
+            if maze.is_open(player[0] + dx, player[1] + dy):
                 player = (player[0] + dx, player[1] + dy)
                 moves += 1
-    if player == treasure:
-        show_popup(time.time() - start_time, moves, optimal_moves)
+            if entities.has(TREASURE, player):
+                break  # The run ends on this step; later keys are not part of it
+    profiler.mark("input")
+    if entities.has(TREASURE, player):
+        replay.finish(tick)
+        end_time = time.time()
+        show_popup(replay, end_time - start_time, moves, optimal_moves)
         running = False
+    profiler.mark("update")
     draw_maze()
-    pygame.display.flip()
+    profiler.draw_overlay(screen, maze_layer)
+    profiler.mark("draw")
+    maze_layer.present()
+    profiler.mark("present")
+replay.finish(tick)
+replay.save()
 pygame.quit()
+report_result("classical", WON if end_time else QUIT, moves, (end_time or time.time()) - start_time, optimal_moves=optimal_moves)
@@ -1,10 +1,16 @@
 import pygame
-import random
 import time
 import tkinter as tk
 from tkinter import messagebox
-from collections import deque
-import heapq
+from maze_bank import choose_maze
+from enemy_ai import EnemyBrain
+from entities import EntityGrid, ENEMY, TREASURE
+from rendering import MazeLayer
+from assets import atlas
+from profiler import frame_profiler
+from scheduler import FixedStepScheduler, Tween
+from replay import Replay
+from sessions import report_result, WON, LOST, QUIT
 
 # Constants
 WIDTH, HEIGHT = 600, 650
@@ -20,38 +26,55 @@ RED = (237, 28, 36)
 BLUE = (0, 162, 232)
 PURPLE = (128, 0, 128)  # Enemy color
 
-# Directions
-DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+# Fixed rates: input every loop pass, game ticks at TICK_RATE, one enemy step every 3 seconds
+LOOP_RATE = 120
+RENDER_FPS = 60
+TICK_RATE = 10  # Game ticks per second; replays count time in ticks
+ENEMY_SPEED = 1 / 3  # Enemy steps per second
+ENEMY_INTERVAL = round(TICK_RATE / ENEMY_SPEED)  # Ticks between enemy steps
+ENEMY_GLIDE = 0.3  # Seconds the enemy sprite takes to slide into its new cell
 
 class MazeGame:
     def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Maze Game")
-        self.clock = pygame.time.Clock()
+        self.scheduler = FixedStepScheduler(LOOP_RATE)
+        self.scheduler.add("tick", TICK_RATE)
+        self.scheduler.add("render", RENDER_FPS)
+        self.profiler = frame_profiler("easy")  # Off unless $MAZE_PROFILE is set
         self.font = pygame.font.SysFont("Arial", 25, bold=True)
         
-        # Load and scale treasure chest image with alpha transparency
-        self.treasure_image = pygame.image.load('treasure.png').convert_alpha()
-        self.treasure_image = pygame.transform.scale(self.treasure_image, (int(CELL_SIZE * 1.5), int(CELL_SIZE * 1.5)))
-
-        # Load and scale player image with alpha transparency
-        self.player_image = pygame.image.load('girl-1.png').convert_alpha()
-        self.player_image = pygame.transform.scale(self.player_image, (int(CELL_SIZE * 1.5), int(CELL_SIZE * 1.5)))
-
-        # Load and scale enemy image with alpha transparency
-        self.enemy_image = pygame.image.load('enemy.png').convert_alpha()
-        self.enemy_image = pygame.transform.scale(self.enemy_image, (int(CELL_SIZE * 1.5), int(CELL_SIZE * 1.5)))
+        # Treasure chest, player and enemy images come pre-scaled from the sprite atlas
+        self.treasure_image = atlas.sprite('treasure.png', (int(CELL_SIZE * 1.5), int(CELL_SIZE * 1.5)))
+        self.player_image = atlas.sprite('girl-1.png', (int(CELL_SIZE * 1.5), int(CELL_SIZE * 1.5)))
+        self.enemy_image = atlas.sprite('enemy.png', (int(CELL_SIZE * 1.5), int(CELL_SIZE * 1.5)))
 
         self.start_screen()
-        self.maze = self.generate_maze(ROWS, COLS)
+        self.maze = choose_maze(ROWS, COLS)
         self.treasure = (ROWS - 2, COLS - 2)
         self.player = (1, 1)
-        self.enemy = (ROWS - 4, COLS - 4)  # Moved enemy to a different location
+        self.enemy = self.maze.nearest_open(ROWS - 4, COLS - 4)  # Nearest open cell, as the corner can be a wall
+        self.brain = EnemyBrain(self.maze, self.enemy, self.player)
+        # Collision checks look cells up here instead of comparing positions
+        self.entities = EntityGrid.for_maze(self.maze)
+        self.entities.add(TREASURE, self.treasure)
+        self.entities.add(ENEMY, self.enemy)
+        self.enemy_tween = Tween(self.enemy, ENEMY_GLIDE)
+
+        # Walls and treasure never move, so they are drawn once to a cached layer
+        self.maze_layer = MazeLayer(self.maze, CELL_SIZE, TOP_MARGIN, (WIDTH, HEIGHT), WHITE, BLACK, WHITE)
+        treasure_rect = self.treasure_image.get_rect()
+        treasure_rect.center = (self.treasure[1] * CELL_SIZE + CELL_SIZE // 2, 
+                                self.treasure[0] * CELL_SIZE + TOP_MARGIN + CELL_SIZE // 2)
+        self.maze_layer.bake(self.treasure_image, treasure_rect)
         self.start_time = time.time()
+        self.end_time = None  # Set when the game is won or lost
         self.moves = 0
         self.running = True
-        self.last_enemy_move = time.time()
+        # The easy enemy never moves at random, so the replay's rng seed is unused
+        self.replay = Replay.for_game("easy", self.maze, 0, TICK_RATE)
+        self.ticks = 0  # Game ticks run so far; input counts toward the next one
 
         self.game_loop()
 
@@ -77,41 +100,39 @@ class MazeGame:
                 if event.type == pygame.KEYDOWN:
                     waiting = False
 
-    def generate_maze(self, rows, cols):
-        grid = [[0 for _ in range(cols)] for _ in range(rows)]
-        start_x, start_y = 1, 1
-        grid[start_x][start_y] = 1
-        walls = [(start_x + dx, start_y + dy) for dx, dy in DIRECTIONS if 0 <= start_x + dx < rows and 0 <= start_y + dy < cols]
-        random.shuffle(walls)
-
-        while walls:
-            wx, wy = walls.pop()
-            if grid[wx][wy] == 0:
-                neighbors = [(wx + dx, wy + dy) for dx, dy in DIRECTIONS if 0 <= wx + dx < rows and 0 <= wy + dy < cols and grid[wx + dx][wy + dy] == 1]
-                if len(neighbors) == 1:
-                    grid[wx][wy] = 1
-                    for dx, dy in DIRECTIONS:
-                        nx, ny = wx + dx, wy + dy
-                        if 0 <= nx < rows and 0 <= ny < cols and grid[nx][ny] == 0:
-                            walls.append((nx, ny))
-            random.shuffle(walls)
-        grid[rows - 2][cols - 2] = 1
-        return grid
-
     def game_loop(self):
         while self.running:
-            self.clock.tick(10)
+            self.profiler.begin_frame()
+            self.scheduler.begin_frame()
+            self.profiler.mark("wait")
             self.handle_events()
-            self.move_enemy()
-            self.draw_maze()
-            pygame.display.flip()
+            self.profiler.mark("input")
+            for _ in range(self.scheduler.due("tick")):
+                self.ticks += 1
+                if self.running and self.ticks % ENEMY_INTERVAL == 0:
+                    self.move_enemy()
+            self.profiler.mark("enemy")
+            if self.scheduler.ready("render"):
+                self.draw_maze()
+                self.profiler.draw_overlay(self.screen, self.maze_layer)
+                self.profiler.mark("draw")
+                self.maze_layer.present()
+                self.profiler.mark("present")
+        self.brain.close()
+        self.replay.finish(self.ticks)
+        self.replay.save()
         pygame.quit()
+        if self.end_time is None:
+            status = QUIT
+        else:
+            status = WON if self.entities.has(TREASURE, self.player) else LOST
+        report_result("easy", status, self.moves, (self.end_time or time.time()) - self.start_time)
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
-            elif event.type == pygame.KEYDOWN:
+            elif event.type == pygame.KEYDOWN and self.running:  # Keys after a win or loss are not part of the run
                 if event.key == pygame.K_UP:
                     self.move_player(-1, 0)
                 elif event.key == pygame.K_DOWN:
@@ -122,100 +143,45 @@ class MazeGame:
                     self.move_player(0, 1)
 
     def move_player(self, dx, dy):
+        self.replay.record(self.ticks + 1, (dx, dy))
         new_x, new_y = self.player[0] + dx, self.player[1] + dy
-        if 0 <= new_x < ROWS and 0 <= new_y < COLS and self.maze[new_x][new_y] == 1:
+        if self.maze.is_open(new_x, new_y):
             self.player = (new_x, new_y)
+            self.brain.update(self.enemy, self.player)
             self.moves += 1
-            if self.player == self.treasure:
+            if self.entities.has(TREASURE, self.player):
                 self.show_popup("You Won!", "Time Taken: {:.2f} seconds\nMoves: {}".format(time.time() - self.start_time, self.moves))
                 self.running = False
-            elif self.player == self.enemy:
+            elif self.entities.has(ENEMY, self.player):
                 self.show_popup("You Lost!", "The enemy caught you!")
                 self.running = False
 
-    def dijkstra_find_path(self, start, goal):
-        """
-        Find the shortest path using Dijkstra's algorithm
-        
-        Args:
-        start (tuple): Starting coordinates (x, y)
-        goal (tuple): Target coordinates (x, y)
-        
-        Returns:
-        list: Shortest path from start to goal
-        """
-        
-        pq = [(0, start, [])]
-        
-        visited = {}
-        
-        while pq:
-            current_distance, current_node, path = heapq.heappop(pq)
-            
-            if current_node == goal:
-                return path + [current_node]
-            
-            if current_node in visited and visited[current_node] <= current_distance:
-                continue
-            
-            visited[current_node] = current_distance
-            
-            for dx, dy in DIRECTIONS:
-                nx, ny = current_node[0] + dx, current_node[1] + dy
-                
-                if (0 <= nx < ROWS and 0 <= ny < COLS and 
-                    self.maze[nx][ny] == 1 and (nx, ny) not in visited):
-                    
-                    new_distance = current_distance + 1
-                    
-                    heapq.heappush(pq, (new_distance, (nx, ny), path + [current_node]))
-        
-        return []
-
-    def find_path(self, start, goal):
-        """
-        Fallback BFS path finding method
-        """
-        queue = deque([(start, [])])
-        visited = set()
-        while queue:
-            (x, y), path = queue.popleft()
-            if (x, y) == goal:
-                return path + [(x, y)]
-            visited.add((x, y))
-            for dx, dy in DIRECTIONS:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < ROWS and 0 <= ny < COLS and self.maze[nx][ny] == 1 and (nx, ny) not in visited:
-                    queue.append(((nx, ny), path + [(x, y)]))
-        return []
-
     def move_enemy(self):
         """
-        Modified enemy movement using Dijkstra's algorithm
+        Enemy movement along the newest plan from the background enemy brain
         """
-        if time.time() - self.last_enemy_move >= 3:
-            self.last_enemy_move = time.time()
-            
-            path = self.dijkstra_find_path(self.enemy, self.player)
-            
-            if not path:
-                path = self.find_path(self.enemy, self.player)
+        next_cell = self.brain.next_step(self.enemy)
+        
+        if next_cell:
+            self.replay.record_enemy(self.ticks, (next_cell[0] - self.enemy[0], next_cell[1] - self.enemy[1]))
+            self.entities.move(ENEMY, self.enemy, next_cell)
+            self.enemy = next_cell
+            self.enemy_tween.move(self.enemy, self.scheduler.now)
+            self.brain.update(self.enemy, self.player)
             
-            if path and len(path) > 1:
-                self.enemy = path[1]
-                
-                if self.enemy == self.player:
-                    self.show_popup("You Lost!", "The enemy caught you!")
-                    self.running = False
+            if self.entities.has(ENEMY, self.player):
+                self.show_popup("You Lost!", "The enemy caught you!")
+                self.running = False
 
     def show_popup(self, title, message):
+        self.end_time = time.time()
         root = tk.Tk()
         root.withdraw()
         messagebox.showinfo(title, message)
         root.destroy()
 
     def draw_maze(self):
-        self.screen.fill(WHITE)
+        self.maze_layer.begin_frame(self.screen)
         
      
         elapsed_time = time.time() - self.start_time
@@ -223,33 +189,21 @@ class MazeGame:
         moves_text = self.font.render(f"Moves: {self.moves}", True, BLACK)
         
        
-        self.screen.blit(timer_text, (10, 10))
-        self.screen.blit(moves_text, (WIDTH - 150, 10))
-        
-        # Draw maze
-        for x in range(ROWS):
-            for y in range(COLS):
-                rect = (y * CELL_SIZE, x * CELL_SIZE + TOP_MARGIN, CELL_SIZE, CELL_SIZE)
-                # Change the drawing of maze blocks to use rounded rectangles
-                pygame.draw.rect(self.screen, BLACK if self.maze[x][y] == 0 else WHITE, rect, border_radius=6)
-        
-       
-        treasure_rect = self.treasure_image.get_rect()
-        treasure_rect.center = (self.treasure[1] * CELL_SIZE + CELL_SIZE // 2, 
-                                self.treasure[0] * CELL_SIZE + TOP_MARGIN + CELL_SIZE // 2)
-        self.screen.blit(self.treasure_image, treasure_rect)
+        self.maze_layer.blit(self.screen, timer_text, (10, 10))
+        self.maze_layer.blit(self.screen, moves_text, (WIDTH - 150, 10))
         
       
+        enemy_x, enemy_y = self.enemy_tween.pos(self.scheduler.now)
         enemy_rect = self.enemy_image.get_rect()
-        enemy_rect.center = (self.enemy[1] * CELL_SIZE + CELL_SIZE // 2, 
-                             self.enemy[0] * CELL_SIZE + TOP_MARGIN + CELL_SIZE // 2)
-        self.screen.blit(self.enemy_image, enemy_rect)
+        enemy_rect.center = (int(enemy_y * CELL_SIZE) + CELL_SIZE // 2, 
+                             int(enemy_x * CELL_SIZE) + TOP_MARGIN + CELL_SIZE // 2)
+        self.maze_layer.blit(self.screen, self.enemy_image, enemy_rect)
         
        
         player_rect = self.player_image.get_rect()
         player_rect.center = (self.player[1] * CELL_SIZE + CELL_SIZE // 2, 
                               self.player[0] * CELL_SIZE + TOP_MARGIN + CELL_SIZE // 2)
-        self.screen.blit(self.player_image, player_rect)
+        self.maze_layer.blit(self.screen, self.player_image, player_rect)
 
 if __name__ == "__main__":
     MazeGame()
\ No newline at end of file
@@ -0,0 +1,168 @@
+import random
+import threading
+
+from maze import DIRECTIONS
+from entities import ENEMY, EntityGrid
+from pathfinding import DistanceField, PursuitPath
+
+
+class EnemyBrain:
+    """ Runs the enemy's pursuit planning on a background thread.
+
+    The game loop posts (maze version, hunter, target) snapshots with
+    update() and reads moves with route()/next_step(); neither call ever
+    waits for a search. The worker only looks at the newest snapshot, so a
+    burst of player moves costs one plan, not one per move. A plan can
+    therefore lag the game by a step or two, which is why replays record
+    the enemy's moves instead of recomputing them. Until a fresher plan is
+    published the enemy keeps following the last one: wherever it stands
+    on that path, the next cell is simply the one after it.
+
+    threaded=False plans inline inside update(), for headless runs.
+    """
+
+    def __init__(self, maze, hunter, target, threaded=True, max_detour=8):
+        self.maze = maze
+        self.maze_version = 0
+        self.threaded = threaded
+        self.max_detour = max_detour
+        self.pursuit = None
+        self.planned_version = None
+        self.plan = (hunter,)
+        self.plans = 0
+        self.snapshot = (self.maze_version, maze, hunter, target)
+        self.condition = threading.Condition()
+        self.stopped = False
+        if threaded:
+            self.thread = threading.Thread(target=self.run, name="enemy-ai", daemon=True)
+            self.thread.start()
+        else:
+            self.thread = None
+            self.think(self.snapshot)
+
+    def update(self, hunter, target):
+        """ Posts the latest positions; replaces any snapshot the worker has not picked up yet. """
+        self.post((self.maze_version, self.maze, hunter, target))
+
+    def set_maze(self, maze, hunter, target):
+        """ Swaps in a changed maze; plans for the old maze are discarded. """
+        self.maze = maze
+        self.maze_version += 1
+        self.post((self.maze_version, maze, hunter, target))
+
+    def post(self, snapshot):
+        if not self.threaded:
+            self.think(snapshot)
+            return
+        with self.condition:
+            self.snapshot = snapshot
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.snapshot is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                snapshot, self.snapshot = self.snapshot, None
+            self.think(snapshot)
+
+    def think(self, snapshot):
+        version, maze, hunter, target = snapshot
+        if self.pursuit is None or version != self.planned_version:
+            self.pursuit = PursuitPath(maze, hunter, target, self.max_detour)
+            self.planned_version = version
+        else:
+            self.pursuit.hunter_moved(hunter)
+            self.pursuit.target_moved(target)
+        pursuit = self.pursuit
+        # Publishing swaps in a new tuple, so readers never see a half-built plan
+        self.plan = tuple(pursuit.path) if pursuit.reachable() else (hunter,)
+        self.plans += 1
+
+    def route(self, hunter):
+        """ The rest of the newest plan from the hunter's cell, or (hunter,) when there is none. """
+        plan = self.plan
+        if plan[0] == hunter:
+            return plan
+        if hunter in plan:
+            return plan[plan.index(hunter):]  # Already moved along it before the worker caught up
+        if len(plan) > 1 and abs(hunter[0] - plan[0][0]) + abs(hunter[1] - plan[0][1]) == 1:
+            return (hunter,) + plan  # One step off the start, e.g. a random move
+        return (hunter,)  # Lost the plan; wait for the worker's next one
+
+    def next_step(self, hunter):
+        """ The hunter's next cell toward the target, or None. """
+        route = self.route(hunter)
+        return route[1] if len(route) > 1 else None
+
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+
+class EnemySwarm:
+    """ Any number of enemies steered by one BFS flow field rooted at the player.
+
+    Every cell's next hop toward the player is known from a single
+    DistanceField, so moving N enemies is N array lookups rather than N
+    searches. The field is rebuilt lazily, once per tick at most and only
+    after the player has moved, which keeps AI cost per tick at O(maze
+    cells + enemies). Each enemy takes a random step with
+    random_move_chance, like the patrol logic of the single-enemy modes,
+    and enemies never share a cell so the swarm spreads along corridors.
+    Positions are mirrored in an EntityGrid (pass one in to share it with
+    the game), so occupancy and capture checks are single lookups.
+    """
+
+    def __init__(self, maze, enemies, player, random_move_chance=0.2, rng=None, entities=None):
+        self.maze = maze
+        self.player = player
+        self.random_move_chance = random_move_chance
+        self.rng = rng or random.Random()
+        self.entities = entities or EntityGrid.for_maze(maze)
+        self.enemies = []
+        self.spawn(enemies)
+        self.field = DistanceField(maze, player)
+        self.fields_built = 1
+
+    def spawn(self, cells):
+        for cell in cells:
+            self.enemies.append(cell)
+            self.entities.add(ENEMY, cell)
+
+    def player_moved(self, pos):
+        self.player = pos
+
+    def step(self):
+        """ Moves every enemy once; returns the new positions. """
+        field = self.field
+        if field.goal != self.player:
+            field.retarget(self.player)
+            self.fields_built += 1
+        maze, rng, chance, entities = self.maze, self.rng, self.random_move_chance, self.entities
+        # Closest enemies go first so the ones behind can move into the cells they leave
+        order = sorted(range(len(self.enemies)), key=lambda n: field.distance(self.enemies[n]))
+        for n in order:
+            enemy = self.enemies[n]
+            if rng.random() < chance:
+                directions = DIRECTIONS[:]
+                rng.shuffle(directions)
+                next_pos = next(((enemy[0] + dx, enemy[1] + dy) for dx, dy in directions
+                                 if maze.is_open(enemy[0] + dx, enemy[1] + dy)), None)
+            else:
+                next_pos = field.next_step(enemy)
+            if next_pos is None:
+                continue
+            if entities.has(ENEMY, next_pos):
+                continue
+            entities.move(ENEMY, enemy, next_pos)
+            self.enemies[n] = next_pos
+        return self.enemies
+
+    def caught(self):
+        return self.entities.has(ENEMY, self.player)
@@ -0,0 +1,66 @@
+""" Per-cell entity index for collision and pickup checks.
+
+Every cell has one byte of layer flags, so "is there a key here?" or "is
+anything solid here?" is a single array lookup however many items are on
+the board. Each layer also keeps the set of cells it occupies so drawing
+can walk just the entities. A layer holds at most one entity per cell.
+"""
+KEY = 1
+LOCK = 2
+ENEMY = 4
+TREASURE = 8
+
+LAYER_NAMES = {KEY: 'key', LOCK: 'lock', ENEMY: 'enemy', TREASURE: 'treasure'}
+
+
+class EntityGrid:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.flags = bytearray(rows * cols)
+        self.cells = {layer: set() for layer in LAYER_NAMES}  # layer -> flat indices
+
+    @classmethod
+    def for_maze(cls, maze):
+        return cls(maze.rows, maze.cols)
+
+    def index(self, pos):
+        return pos[0] * self.cols + pos[1]
+
+    def in_bounds(self, pos):
+        return 0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols
+
+    def add(self, layer, pos):
+        i = self.index(pos)
+        self.flags[i] |= layer
+        self.cells[layer].add(i)
+
+    def add_all(self, layer, positions):
+        for pos in positions:
+            self.add(layer, pos)
+
+    def remove(self, layer, pos):
+        """ Removes the entity of `layer` at pos; False if there was none. """
+        if not self.in_bounds(pos):
+            return False
+        i = self.index(pos)
+        if not self.flags[i] & layer:
+            return False
+        self.flags[i] &= ~layer
+        self.cells[layer].discard(i)
+        return True
+
+    # Picking up an item is removing it and learning whether it was there
+    take = remove
+
+    def move(self, layer, old, new):
+        self.remove(layer, old)
+        self.add(layer, new)
+
+    def has(self, layer, pos):
+        """ True if pos holds an entity of `layer` (or of any layer in a mask like KEY | LOCK). """
+        return self.in_bounds(pos) and bool(self.flags[pos[0] * self.cols + pos[1]] & layer)
+
+    def positions(self, layer):
+        """ Cells holding `layer`, as (x, y) tuples. """
+        return [divmod(i, self.cols) for i in self.cells[layer]]
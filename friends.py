@@ -3,12 +3,21 @@ import random
 import time
 import tkinter as tk
 from tkinter import messagebox
+from maze_bank import choose_maze
+from rendering import MazeLayer, SurfaceCache
+from assets import atlas
+from profiler import frame_profiler
+from keylock import place_keys_and_locks
+from entities import EntityGrid, KEY, LOCK, TREASURE
+from replay import Replay
+from sessions import report_result, WON, QUIT
 
 # Constants
 WIDTH, HEIGHT = 600, 650
 ROWS, COLS = 21, 21
 CELL_SIZE = WIDTH // COLS
 TOP_MARGIN = 60
+TICK_RATE = 10  # Frames per second; replays count time in frames
 
 # Colors
 WHITE = (240, 240, 240)
@@ -23,27 +32,29 @@ pygame.init()
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Maze Game")
 clock = pygame.time.Clock()
+profiler = frame_profiler("friends")  # Off unless $MAZE_PROFILE is set
 font = pygame.font.SysFont("Arial", 25, bold=True)
 large_font = pygame.font.SysFont("Arial", 36, bold=True)
 countdown_font = pygame.font.SysFont("Arial", 200, bold=True)
 
-# Directions for movement
-DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+# Scaled sprites and HUD text are rendered once and reused every frame
+surface_cache = SurfaceCache()
 
 class AvatarSelector:
     def __init__(self):
+        # Avatar file names; sprites are loaded from the atlas on first use
         self.avatars = {
             'red': [
-                pygame.image.load("girl-1.png"),
-                pygame.image.load("girl-2.png"),
-                pygame.image.load("boy-1.png"),
-                pygame.image.load("boy-2.png")
+                "girl-1.png",
+                "girl-2.png",
+                "boy-1.png",
+                "boy-2.png"
             ],
             'blue': [
-                pygame.image.load("girl-p2-1.png"),
-                pygame.image.load("girl-p2-2.png"),
-                pygame.image.load("boy-p2-1.png"),
-                pygame.image.load("boy-p2-2.png")
+                "girl-p2-1.png",
+                "girl-p2-2.png",
+                "boy-p2-1.png",
+                "boy-p2-2.png"
             ]
         }
         self.selected_avatars = {
@@ -55,24 +66,22 @@ class AvatarSelector:
         screen.fill(BLACK)
         
         # Title
-        title = large_font.render("Select Your Avatars", True, WHITE)
+        title = surface_cache.text(large_font, "Select Your Avatars", WHITE)
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
 
         # Red Player Avatar Selection
-        red_label = font.render("Red Player", True, RED)
+        red_label = surface_cache.text(font, "Red Player", RED)
         screen.blit(red_label, (100, 150))
         
-        current_red_avatar = self.avatars['red'][self.selected_avatars['red']]
-        current_red_avatar = pygame.transform.scale(current_red_avatar, (100, 100))
+        current_red_avatar = atlas.sprite(self.avatars['red'][self.selected_avatars['red']], (100, 100))
         red_rect = current_red_avatar.get_rect(center=(150, 300))
         screen.blit(current_red_avatar, red_rect)
         
         # Blue Player Avatar Selection
-        blue_label = font.render("Blue Player", True, BLUE)
+        blue_label = surface_cache.text(font, "Blue Player", BLUE)
         screen.blit(blue_label, (400, 150))
         
-        current_blue_avatar = self.avatars['blue'][self.selected_avatars['blue']]
-        current_blue_avatar = pygame.transform.scale(current_blue_avatar, (100, 100))
+        current_blue_avatar = atlas.sprite(self.avatars['blue'][self.selected_avatars['blue']], (100, 100))
         blue_rect = current_blue_avatar.get_rect(center=(450, 300))
         screen.blit(current_blue_avatar, blue_rect)
 
@@ -85,8 +94,8 @@ class AvatarSelector:
         
         y_position = 450
         for key, text, color in instructions:
-            key_text = font.render(key, True, color)
-            desc_text = font.render(text, True, WHITE)
+            key_text = surface_cache.text(font, key, color)
+            desc_text = surface_cache.text(font, text, WHITE)
 
             key_x = WIDTH // 2 - key_text.get_width() - 10
             desc_x = WIDTH // 2 + 10
@@ -148,67 +157,51 @@ class MazeGame:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Maze Game")
         
-        # Load images
-        self.treasure_image = pygame.image.load("treasure.png")
-        self.treasure_image = pygame.transform.scale(self.treasure_image, (CELL_SIZE, CELL_SIZE))
+        # Key and lock images, pre-scaled in the sprite atlas
+        self.key_image = atlas.sprite("key.png", (CELL_SIZE, CELL_SIZE))
+        self.lock_image = atlas.sprite("lock.png", (CELL_SIZE, CELL_SIZE))
         
-        # Load key and lock images
-        self.key_image = pygame.image.load("key.png")
-        self.key_image = pygame.transform.scale(self.key_image, (CELL_SIZE, CELL_SIZE))
-        self.lock_image = pygame.image.load("lock.png")
-        self.lock_image = pygame.transform.scale(self.lock_image, (CELL_SIZE, CELL_SIZE))
-        
-        self.maze = self.generate_maze(ROWS, COLS)
+        self.maze = choose_maze(ROWS, COLS)
         self.treasure = (ROWS - 2, COLS - 2)
         self.player_red = (1, 1)
         self.player_blue = (1, COLS - 2)
+        # Key and lock placement has its own seeded generator so the game's replay can reproduce it
+        self.rng_seed = random.randrange(2 ** 63)
+        self.rng = random.Random(self.rng_seed)
         
-        # Place keys and locks
-        self.keys, self.locks = self.place_locks_and_keys()
+        # Place keys and locks, indexed by cell for O(1) pickup and collision checks
+        keys, locks = self.place_locks_and_keys()
+        self.entities = EntityGrid.for_maze(self.maze)
+        self.entities.add_all(KEY, keys)
+        self.entities.add_all(LOCK, locks)
+        self.entities.add(TREASURE, self.treasure)
+
+        # Gradient, walls and treasure never change, so they are drawn once
+        self.maze_layer = MazeLayer(self.maze, CELL_SIZE, TOP_MARGIN, (WIDTH, HEIGHT), self.draw_background, BLACK, None)
+        # Draw larger treasure image
+        enlarged_treasure = atlas.sprite("treasure.png", (CELL_SIZE + 10, CELL_SIZE + 10))
+        self.maze_layer.bake(enlarged_treasure, (self.treasure[1] * CELL_SIZE - 5, self.treasure[0] * CELL_SIZE + TOP_MARGIN - 5))
         
         self.start_time = time.time()
+        self.end_time = None  # Set when a player reaches the treasure
         self.red_moves = 0
         self.blue_moves = 0
         self.red_keys = 0
         self.blue_keys = 0
         self.running = True
+        self.replay = Replay.for_game("friends", self.maze, self.rng_seed, TICK_RATE)
+        self.ticks = 0
 
         self.game_loop()
 
-    def generate_maze(self, rows, cols):
-        grid = [[0 for _ in range(cols)] for _ in range(rows)]
-        start_x, start_y = 1, 1
-        grid[start_x][start_y] = 1
-
-        walls = [(start_x + dx, start_y + dy) for dx, dy in DIRECTIONS if 0 <= start_x + dx < rows and 0 <= start_y + dy < cols]
-        random.shuffle(walls)
-
-        while walls:
-            wx, wy = walls.pop()
-            if grid[wx][wy] == 0:
-                neighbors = [(wx + dx, wy + dy) for dx, dy in DIRECTIONS if 0 <= wx + dx < rows and 0 <= wy + dy < cols and grid[wx + dx][wy + dy] == 1]
-                if len(neighbors) == 1:  
-                    grid[wx][wy] = 1  
-                    for dx, dy in DIRECTIONS:
-                        nx, ny = wx + dx, wy + dy
-                        if 0 <= nx < rows and 0 <= ny < cols and grid[nx][ny] == 0:
-                            walls.append((nx, ny))
-            random.shuffle(walls)
-        grid[rows - 2][cols - 2] = 1
-        return grid
-
     def place_locks_and_keys(self):
-        empty_spaces = [(x, y) for x in range(ROWS) for y in range(COLS) if self.maze[x][y] == 1 and 
-                        (x, y) not in [self.player_red, self.player_blue, self.treasure]]
-        random.shuffle(empty_spaces)
-        keys = empty_spaces[:2]
-        locks = empty_spaces[2:4]
-        return keys, locks
+        # Random cells, checked (and repaired if needed) so neither player can be locked out
+        return place_keys_and_locks(self.maze, [self.player_red, self.player_blue], self.treasure, 2, 2, rng=self.rng)
 
     def show_popup(self):
         root = tk.Tk()
         root.withdraw()
-        end_time = time.time()
+        end_time = self.end_time = time.time()
         
         # Determine the winner
         if self.player_red == self.treasure:
@@ -225,11 +218,26 @@ class MazeGame:
 
     def game_loop(self):
         while self.running:
-            clock.tick(10)
+            profiler.begin_frame()
+            clock.tick(TICK_RATE)
+            self.ticks += 1
+            profiler.mark("wait")
             self.handle_events()
+            profiler.mark("input")
             self.draw_maze()
-            pygame.display.flip()
+            profiler.draw_overlay(self.screen, self.maze_layer)
+            profiler.mark("draw")
+            self.maze_layer.present()
+            profiler.mark("present")
+        self.replay.finish(self.ticks)
+        self.replay.save()
         pygame.quit()
+        if self.end_time is None:
+            report_result("friends", QUIT, self.red_moves + self.blue_moves, time.time() - self.start_time)
+        else:
+            winner = "red" if self.player_red == self.treasure else "blue"
+            report_result("friends", WON, self.red_moves + self.blue_moves, self.end_time - self.start_time,
+                          winner=winner, red_moves=self.red_moves, blue_moves=self.blue_moves)
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -247,24 +255,24 @@ class MazeGame:
                         dx, dy = 0, -1
                     elif event.key == pygame.K_d:
                         dx, dy = 0, 1
+                    self.replay.record(self.ticks, (dx, dy), player=0)
                     
                     new_x, new_y = self.player_red[0] + dx, self.player_red[1] + dy
                     
                     # Check for key collection
-                    if (new_x, new_y) in self.keys:
-                        self.keys.remove((new_x, new_y))
+                    if self.entities.take(KEY, (new_x, new_y)):
                         self.red_keys += 1
                     
                     # Check for lock interaction
-                    if (new_x, new_y) in self.locks:
+                    if self.entities.has(LOCK, (new_x, new_y)):
                         if self.red_keys > 0:
                             self.red_keys -= 1
-                            self.locks.remove((new_x, new_y))
+                            self.entities.remove(LOCK, (new_x, new_y))
                         else:
                             continue
                     
                     # Normal movement
-                    if 0 <= new_x < ROWS and 0 <= new_y < COLS and self.maze[new_x][new_y] == 1:
+                    if self.maze.is_open(new_x, new_y):
                         self.player_red = (new_x, new_y)
                         self.red_moves += 1
 
@@ -279,33 +287,34 @@ class MazeGame:
                         dx, dy = 0, -1
                     elif event.key == pygame.K_RIGHT:
                         dx, dy = 0, 1
+                    self.replay.record(self.ticks, (dx, dy), player=1)
                     
                     new_x, new_y = self.player_blue[0] + dx, self.player_blue[1] + dy
                     
                     # Check for key collection
-                    if (new_x, new_y) in self.keys:
-                        self.keys.remove((new_x, new_y))
+                    if self.entities.take(KEY, (new_x, new_y)):
                         self.blue_keys += 1
                     
                     # Check for lock interaction
-                    if (new_x, new_y) in self.locks:
+                    if self.entities.has(LOCK, (new_x, new_y)):
                         if self.blue_keys > 0:
                             self.blue_keys -= 1
-                            self.locks.remove((new_x, new_y))
+                            self.entities.remove(LOCK, (new_x, new_y))
                         else:
                             continue
                     
                     # Normal movement
-                    if 0 <= new_x < ROWS and 0 <= new_y < COLS and self.maze[new_x][new_y] == 1:
+                    if self.maze.is_open(new_x, new_y):
                         self.player_blue = (new_x, new_y)
                         self.blue_moves += 1
 
                 # Check for treasure collection
-                if self.player_red == self.treasure or self.player_blue == self.treasure:
+                if self.entities.has(TREASURE, self.player_red) or self.entities.has(TREASURE, self.player_blue):
                     self.show_popup()
                     self.running = False
+                    return  # Keys after the win are not part of the run
 
-    def draw_maze(self):
+    def draw_background(self, surface):
         # Background gradient
         for i in range(HEIGHT):
             color = (
@@ -313,47 +322,40 @@ class MazeGame:
                 BG_GRADIENT[0][1] + (BG_GRADIENT[1][1] - BG_GRADIENT[0][1]) * i // HEIGHT,
                 BG_GRADIENT[0][2] + (BG_GRADIENT[1][2] - BG_GRADIENT[0][2]) * i // HEIGHT,
             )
-            pygame.draw.line(self.screen, color, (0, i), (WIDTH, i))
+            pygame.draw.line(surface, color, (0, i), (WIDTH, i))
+
+    def draw_maze(self):
+        # Restore the cached static layer under last frame's sprites and HUD
+        self.maze_layer.begin_frame(self.screen)
 
         # Timer and moves
         elapsed_time = time.time() - self.start_time
-        timer_text = font.render(f"Time: {elapsed_time:.2f}s", True, BLACK)
-        red_moves_text = font.render(f"Red Moves: {self.red_moves}", True, BLACK)
-        blue_moves_text = font.render(f"Blue Moves: {self.blue_moves}", True, BLACK)
-        red_keys_text = font.render(f"Red Keys: {self.red_keys}", True, BLACK)
-        blue_keys_text = font.render(f"Blue Keys: {self.blue_keys}", True, BLACK)
+        timer_text = surface_cache.glyph_text(font, f"Time: {elapsed_time:.2f}s", BLACK)
+        red_moves_text = surface_cache.text(font, f"Red Moves: {self.red_moves}", BLACK)
+        blue_moves_text = surface_cache.text(font, f"Blue Moves: {self.blue_moves}", BLACK)
+        red_keys_text = surface_cache.text(font, f"Red Keys: {self.red_keys}", BLACK)
+        blue_keys_text = surface_cache.text(font, f"Blue Keys: {self.blue_keys}", BLACK)
         
-        self.screen.blit(timer_text, (20, 15))
-        self.screen.blit(blue_moves_text, (WIDTH // 2 - 120, 15))
-        self.screen.blit(blue_keys_text, (WIDTH // 2 - 120, 40))
-        self.screen.blit(red_moves_text, (WIDTH - 180, 15))
-        self.screen.blit(red_keys_text, (WIDTH - 180, 40))
-
-        # Draw maze
-        for x in range(ROWS):
-            for y in range(COLS):
-                rect = (y * CELL_SIZE, x * CELL_SIZE + TOP_MARGIN, CELL_SIZE, CELL_SIZE)
-                if self.maze[x][y] == 0:
-                    pygame.draw.rect(self.screen, BLACK, rect, border_radius=6)
-                elif (x, y) == self.treasure:
-                    # Draw larger treasure image
-                    enlarged_treasure = pygame.transform.scale(self.treasure_image, (CELL_SIZE + 10, CELL_SIZE + 10))
-                    self.screen.blit(enlarged_treasure, (y * CELL_SIZE - 5, x * CELL_SIZE + TOP_MARGIN - 5))
+        self.maze_layer.blit(self.screen, timer_text, (20, 15))
+        self.maze_layer.blit(self.screen, blue_moves_text, (WIDTH // 2 - 120, 15))
+        self.maze_layer.blit(self.screen, blue_keys_text, (WIDTH // 2 - 120, 40))
+        self.maze_layer.blit(self.screen, red_moves_text, (WIDTH - 180, 15))
+        self.maze_layer.blit(self.screen, red_keys_text, (WIDTH - 180, 40))
 
         # Draw keys
-        for key in self.keys:
-            self.screen.blit(self.key_image, (key[1] * CELL_SIZE, key[0] * CELL_SIZE + TOP_MARGIN))
+        for key in self.entities.positions(KEY):
+            self.maze_layer.blit(self.screen, self.key_image, (key[1] * CELL_SIZE, key[0] * CELL_SIZE + TOP_MARGIN))
 
         # Draw locks
-        for lock in self.locks:
-            self.screen.blit(self.lock_image, (lock[1] * CELL_SIZE, lock[0] * CELL_SIZE + TOP_MARGIN))
+        for lock in self.entities.positions(LOCK):
+            self.maze_layer.blit(self.screen, self.lock_image, (lock[1] * CELL_SIZE, lock[0] * CELL_SIZE + TOP_MARGIN))
 
         # Draw players with larger avatars
-        enlarged_red_avatar = pygame.transform.scale(self.red_avatar, (CELL_SIZE + 10, CELL_SIZE + 10))
-        enlarged_blue_avatar = pygame.transform.scale(self.blue_avatar, (CELL_SIZE + 10, CELL_SIZE + 10))
+        enlarged_red_avatar = atlas.sprite(self.red_avatar, (CELL_SIZE + 10, CELL_SIZE + 10))
+        enlarged_blue_avatar = atlas.sprite(self.blue_avatar, (CELL_SIZE + 10, CELL_SIZE + 10))
         
-        self.screen.blit(enlarged_red_avatar, (self.player_red[1] * CELL_SIZE - 5, self.player_red[0] * CELL_SIZE + TOP_MARGIN - 5))
-        self.screen.blit(enlarged_blue_avatar, (self.player_blue[1] * CELL_SIZE - 5, self.player_blue[0] * CELL_SIZE + TOP_MARGIN - 5))
+        self.maze_layer.blit(self.screen, enlarged_red_avatar, (self.player_red[1] * CELL_SIZE - 5, self.player_red[0] * CELL_SIZE + TOP_MARGIN - 5))
+        self.maze_layer.blit(self.screen, enlarged_blue_avatar, (self.player_blue[1] * CELL_SIZE - 5, self.player_blue[0] * CELL_SIZE + TOP_MARGIN - 5))
 
 def main():
     # Avatar Selection
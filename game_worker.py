@@ -0,0 +1,45 @@
+""" Pre-warmed game process used by the server's worker pool.
+
+Does all the slow start-up work (importing pygame and tkinter, pygame.init,
+scanning system fonts, decoding the sprite atlas) before any player has
+clicked, then blocks until the server writes the mode to play on stdin.
+The game's result goes back on the original stdout pipe.
+"""
+import os
+import runpy
+import sys
+
+import pygame
+import tkinter  # noqa: F401  (imported for its start-up cost)
+
+import maze  # noqa: F401
+import pathfinding  # noqa: F401
+import rendering  # noqa: F401
+from assets import atlas
+from sessions import GAME_SCRIPTS, RESULT_FD_ENV
+
+
+def warm_up():
+    pygame.init()
+    # SysFont scans the system font list on first use; every mode uses Arial
+    for size in (25, 30, 36, 50, 200):
+        pygame.font.SysFont("Arial", size, bold=True)
+    atlas.load()
+
+
+def main():
+    warm_up()
+    print("ready", flush=True)
+    mode = sys.stdin.readline().strip()
+    if mode not in GAME_SCRIPTS:
+        return  # Pool shut down or sent nothing
+    # The pool's pipe now carries only the game's result (sessions.report_result);
+    # anything the game prints goes to stderr
+    os.environ[RESULT_FD_ENV] = str(os.dup(sys.stdout.fileno()))
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.argv = [GAME_SCRIPTS[mode]]
+    runpy.run_path(GAME_SCRIPTS[mode], run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 import pygame
 import random
 import time
-import heapq
+from maze_bank import choose_maze
+from enemy_ai import EnemyBrain
+from entities import EntityGrid, ENEMY, TREASURE
+from rendering import MazeLayer
+from assets import atlas
+from profiler import frame_profiler
+from scheduler import FixedStepScheduler, Tween
+from replay import Replay
+from sessions import report_result, WON, LOST, QUIT
 
 # Constants
 WIDTH, HEIGHT = 600, 650  # Space for UI
@@ -17,82 +25,49 @@ BLACK = (30, 30, 30)
 pygame.init()
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Maze Game - Escape the Enemy!")
-clock = pygame.time.Clock()
+profiler = frame_profiler("hard")  # Off unless $MAZE_PROFILE is set
 font = pygame.font.SysFont("Arial", 30, bold=True)
 
-# Load images with slightly larger scaling (1.2x original size)
-girl_img = pygame.transform.scale(pygame.image.load("girl-1.png"), (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
-treasure_img = pygame.transform.scale(pygame.image.load("treasure.png"), (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
-enemy_img = pygame.transform.scale(pygame.image.load("enemy.png"), (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
+# Images with slightly larger scaling (1.2x original size), pre-baked in the sprite atlas
+girl_img = atlas.sprite("girl-1.png", (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
+treasure_img = atlas.sprite("treasure.png", (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
+enemy_img = atlas.sprite("enemy.png", (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
 
 DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+ARROW_KEYS = {pygame.K_UP: (-1, 0), pygame.K_DOWN: (1, 0), pygame.K_LEFT: (0, -1), pygame.K_RIGHT: (0, 1)}
 
 # Enemy movement difficulty
-ENEMY_SPEED = 5  # Lower value = slower enemy
+ENEMY_SPEED = 5  # Enemy decisions per second; lower value = slower enemy
 PATROL_AREA = [(3, 3), (3, COLS - 4), (ROWS - 4, COLS - 4), (ROWS - 4, 3)]
 RANDOM_MOVE_CHANCE = 0.2
 
-def generate_maze(rows, cols):
-    grid = [[0 for _ in range(cols)] for _ in range(rows)]
-    start_x, start_y = 1, 1
-    grid[start_x][start_y] = 1
-    walls = [(start_x + dx, start_y + dy) for dx, dy in DIRECTIONS if 0 <= start_x + dx < rows and 0 <= start_y + dy < cols]
-    random.shuffle(walls)
-
-    while walls:
-        wx, wy = walls.pop()
-        if grid[wx][wy] == 0:
-            neighbors = [(wx + dx, wy + dy) for dx, dy in DIRECTIONS if 0 <= wx + dx < rows and 0 <= wy + dy < cols and grid[wx + dx][wy + dy] == 1]
-            if len(neighbors) == 1:
-                grid[wx][wy] = 1
-                for dx, dy in DIRECTIONS:
-                    nx, ny = wx + dx, wy + dy
-                    if 0 <= nx < rows and 0 <= ny < cols and grid[nx][ny] == 0:
-                        walls.append((nx, ny))
-        random.shuffle(walls)
-
-    grid[rows - 2][cols - 2] = 1
-    return grid
-
-def a_star_search(maze, start, goal):
-    heap = [(0, start)]
-    came_from = {start: None}
-    cost_so_far = {start: 0}
-    
-    while heap:
-        _, current = heapq.heappop(heap)
-        if current == goal:
-            break
-        
-        for dx, dy in DIRECTIONS:
-            next_pos = (current[0] + dx, current[1] + dy)
-            if 0 <= next_pos[0] < ROWS and 0 <= next_pos[1] < COLS and maze[next_pos[0]][next_pos[1]] == 1:
-                new_cost = cost_so_far[current] + 1
-                if next_pos not in cost_so_far or new_cost < cost_so_far[next_pos]:
-                    cost_so_far[next_pos] = new_cost
-                    priority = new_cost + abs(goal[0] - next_pos[0]) + abs(goal[1] - next_pos[1])
-                    heapq.heappush(heap, (priority, next_pos))
-                    came_from[next_pos] = current
-    
-    path = []
-    current = goal
-    while current is not None:
-        path.append(current)
-        current = came_from.get(current)
-    return path[::-1]
+# Input is polled every loop pass; AI and drawing run at their own fixed rates
+LOOP_RATE = 120
+RENDER_FPS = 60
+scheduler = FixedStepScheduler(LOOP_RATE)
+scheduler.add("enemy", ENEMY_SPEED)
+scheduler.add("render", RENDER_FPS)
 
 def move_enemy():
     global enemy, enemy_moves
-    if random.random() < RANDOM_MOVE_CHANCE:
-        random.shuffle(DIRECTIONS)
-        for dx, dy in DIRECTIONS:
+    if rng.random() < RANDOM_MOVE_CHANCE:
+        directions = DIRECTIONS[:]
+        rng.shuffle(directions)
+        for dx, dy in directions:
             next_pos = (enemy[0] + dx, enemy[1] + dy)
-            if 0 <= next_pos[0] < ROWS and 0 <= next_pos[1] < COLS and maze[next_pos[0]][next_pos[1]] == 1:
+            if 0 <= next_pos[0] < ROWS and 0 <= next_pos[1] < COLS and maze[next_pos] == 1:
+                replay.record_enemy(ticks, (dx, dy))
+                entities.move(ENEMY, enemy, next_pos)
                 enemy = next_pos
+                brain.update(enemy, player)
                 return
-    path = a_star_search(maze, enemy, player)
-    if len(path) > 2:
-        enemy = path[1]
+    # Planning runs on the brain's thread; follow its newest plan without waiting
+    route = brain.route(enemy)
+    if len(route) > 2:
+        replay.record_enemy(ticks, (route[1][0] - enemy[0], route[1][1] - enemy[1]))
+        entities.move(ENEMY, enemy, route[1])
+        enemy = route[1]
+        brain.update(enemy, player)
     enemy_moves += 1
 
 def show_popup(message):
@@ -106,55 +81,88 @@ def show_popup(message):
     time.sleep(3)
 
 def draw_maze():
-    screen.fill(WHITE)
-    for x in range(ROWS):
-        for y in range(COLS):
-            rect = (y * CELL_SIZE, x * CELL_SIZE + TOP_MARGIN, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(screen, BLACK if maze[x][y] == 0 else WHITE, rect, border_radius=6)
-    
-    # Draw treasure with adjusted positioning to center the larger image
-    screen.blit(treasure_img, (treasure[1] * CELL_SIZE - int(CELL_SIZE * 0.1), treasure[0] * CELL_SIZE + TOP_MARGIN - int(CELL_SIZE * 0.1)))
+    # Walls and treasure come from the cached layer; only sprites and HUD are redrawn
+    maze_layer.begin_frame(screen)
     
     # Draw player (girl) with adjusted positioning to center the larger image
-    screen.blit(girl_img, (player[1] * CELL_SIZE - int(CELL_SIZE * 0.1), player[0] * CELL_SIZE + TOP_MARGIN - int(CELL_SIZE * 0.1)))
+    maze_layer.blit(screen, girl_img, (player[1] * CELL_SIZE - int(CELL_SIZE * 0.1), player[0] * CELL_SIZE + TOP_MARGIN - int(CELL_SIZE * 0.1)))
     
-    # Draw enemy with adjusted positioning to center the larger image
-    screen.blit(enemy_img, (enemy[1] * CELL_SIZE - int(CELL_SIZE * 0.1), enemy[0] * CELL_SIZE + TOP_MARGIN - int(CELL_SIZE * 0.1)))
+    # Draw enemy with adjusted positioning to center the larger image, sliding between cells
+    enemy_x, enemy_y = enemy_tween.pos(scheduler.now)
+    maze_layer.blit(screen, enemy_img, (int(enemy_y * CELL_SIZE) - int(CELL_SIZE * 0.1), int(enemy_x * CELL_SIZE) + TOP_MARGIN - int(CELL_SIZE * 0.1)))
     
     move_text = font.render(f"Moves: {moves}  Time: {int(time.time() - start_time)}s", True, BLACK)
-    screen.blit(move_text, (20, 15))
+    maze_layer.blit(screen, move_text, (20, 15))
 
-maze = generate_maze(ROWS, COLS)
+maze = choose_maze(ROWS, COLS)
 treasure = (ROWS - 2, COLS - 2)
 player = (1, 1)
-enemy = random.choice(PATROL_AREA)
+# Enemy randomness has its own seeded generator so the game's replay can reproduce it
+rng_seed = random.randrange(2 ** 63)
+rng = random.Random(rng_seed)
+# Patrol cells can be walls in a generated maze; the enemy starts on the nearest open cell instead
+enemy = maze.nearest_open(*rng.choice(PATROL_AREA))
+# Collision and pickup checks look cells up here instead of comparing positions
+entities = EntityGrid.for_maze(maze)
+entities.add(TREASURE, treasure)
+entities.add(ENEMY, enemy)
 moves = 0
 enemy_moves = 0
 player_headstart = 7
+maze_layer = MazeLayer(maze, CELL_SIZE, TOP_MARGIN, (WIDTH, HEIGHT), WHITE, BLACK, WHITE)
+# Draw treasure with adjusted positioning to center the larger image
+maze_layer.bake(treasure_img, (treasure[1] * CELL_SIZE - int(CELL_SIZE * 0.1), treasure[0] * CELL_SIZE + TOP_MARGIN - int(CELL_SIZE * 0.1)))
+brain = EnemyBrain(maze, enemy, player)
+enemy_tween = Tween(enemy, 1 / ENEMY_SPEED)
+replay = Replay.for_game("hard", maze, rng_seed, ENEMY_SPEED)
+ticks = 0  # Enemy ticks run so far; input counts toward the next one
 start_time = time.time()
+end_time = None  # Set when the game is won or lost
 
 running = True
 while running:
-    clock.tick(ENEMY_SPEED)
+    profiler.begin_frame()
+    scheduler.begin_frame()
+    profiler.mark("wait")
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
-        elif event.type == pygame.KEYDOWN:
-            dx, dy = {pygame.K_UP: (-1, 0), pygame.K_DOWN: (1, 0), pygame.K_LEFT: (0, -1), pygame.K_RIGHT: (0, 1)}.get(event.key, (0, 0))
-            if maze[player[0] + dx][player[1] + dy] == 1:
+        elif event.type == pygame.KEYDOWN and event.key in ARROW_KEYS:
+            dx, dy = ARROW_KEYS[event.key]
+            replay.record(ticks + 1, (dx, dy))
+            if maze.is_open(player[0] + dx, player[1] + dy):
                 player = (player[0] + dx, player[1] + dy)
+                brain.update(enemy, player)
                 moves += 1
+            if entities.has(TREASURE | ENEMY, player):
+                break  # The run ends on this step; later keys are not part of it
+    profiler.mark("input")
     
-    if moves > player_headstart and moves % 5 == 0:
-        move_enemy()
+    for _ in range(scheduler.due("enemy")):
+        ticks += 1
+        if moves > player_headstart and moves % 5 == 0 and not entities.has(ENEMY, player):
+            move_enemy()
+            enemy_tween.move(enemy, scheduler.now)
+    profiler.mark("enemy")
     
-    if player == treasure:
-        show_popup(f"You Won! Time: {int(time.time() - start_time)}s")
+    if entities.has(TREASURE, player):
+        end_time = time.time()
+        show_popup(f"You Won! Time: {int(end_time - start_time)}s")
         running = False
-    elif player == enemy:
+    elif entities.has(ENEMY, player):
+        end_time = time.time()
         running = False
     
-    draw_maze()
-    pygame.display.flip()
-
-pygame.quit()
\ No newline at end of file
+    if scheduler.ready("render"):
+        draw_maze()
+        profiler.draw_overlay(screen, maze_layer)
+        profiler.mark("draw")
+        maze_layer.present()
+        profiler.mark("present")
+
+brain.close()
+replay.finish(ticks)
+replay.save()
+pygame.quit()
+status = QUIT if end_time is None else WON if entities.has(TREASURE, player) else LOST
+report_result("hard", status, moves, (end_time or time.time()) - start_time, enemy_moves=enemy_moves)
\ No newline at end of file
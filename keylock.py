@@ -0,0 +1,157 @@
+""" Solvability checks for the key and lock puzzles of friends mode.
+
+Any key opens any lock and is used up doing so. For one player the state
+is (position, keys picked up, locks opened), but two facts shrink it a lot:
+walking never closes anything, so the player can be anywhere in the area
+reachable so far, and picking up a key never hurts, so every reachable key
+is always taken. What is left is the set of locks opened, one bitmask, and
+a search over those masks.
+
+The search runs on a region graph instead of the cell grid: the open cells
+are split into regions by the lock cells once, so checking a state walks
+regions and locks rather than cells.
+"""
+import random
+from array import array
+from collections import deque
+
+MAX_STATES = 100000  # Lock masks explored before a layout is given up on
+
+
+class KeyLockSolver:
+    def __init__(self, maze, keys, locks):
+        self.maze = maze
+        self.keys = list(keys)
+        self.locks = list(locks)
+        self.build_regions()
+        self.blocking = []  # After a failed solve(): closed locks at the edge of the furthest state reached
+
+    def build_regions(self):
+        maze = self.maze
+        lock_at = {maze.index(*lock): n for n, lock in enumerate(self.locks)}
+        key_cells = {maze.index(*key) for key in self.keys}
+        self.region = region = array('i', [-1]) * maze.size
+        self.region_keys = []  # Keys lying in each region
+        self.region_locks = []  # Locks next to each region
+        self.lock_regions = [set() for _ in self.locks]  # Regions next to each lock
+        self.lock_links = [set() for _ in self.locks]  # Locks next to each lock
+        for i, n in lock_at.items():
+            for j in maze.neighbors(i):
+                if j in lock_at:
+                    self.lock_links[n].add(lock_at[j])
+        for root in range(maze.size):
+            if region[root] >= 0 or root in lock_at or not maze.get(root):
+                continue
+            r = len(self.region_keys)
+            region[root] = r
+            keys = 0
+            locks = set()
+            queue = deque([root])
+            while queue:
+                i = queue.popleft()
+                keys += i in key_cells
+                for j in maze.neighbors(i):
+                    if j in lock_at:
+                        locks.add(lock_at[j])
+                    elif region[j] < 0:
+                        region[j] = r
+                        queue.append(j)
+            self.region_keys.append(keys)
+            self.region_locks.append(sorted(locks))
+            for n in locks:
+                self.lock_regions[n].add(r)
+
+    def start_regions(self, start):
+        """ Regions a player at start can walk in; a start on a wall cell can step out to any open neighbour. """
+        maze = self.maze
+        i = maze.index(*start)
+        if self.region[i] >= 0:
+            return {self.region[i]}
+        return {self.region[j] for j in maze.neighbors(i) if self.region[j] >= 0}
+
+    def reach(self, start_regions, opened):
+        """ (regions reached, keys there, closed locks on the edge) with the locks in `opened` open. """
+        seen_regions = set(start_regions)
+        seen_locks = set()
+        frontier = set()
+        stack = [('region', r) for r in start_regions]
+        while stack:
+            kind, node = stack.pop()
+            locks = self.region_locks[node] if kind == 'region' else self.lock_links[node]
+            if kind == 'lock':
+                for r in self.lock_regions[node]:
+                    if r not in seen_regions:
+                        seen_regions.add(r)
+                        stack.append(('region', r))
+            for n in locks:
+                if not opened >> n & 1:
+                    frontier.add(n)
+                elif n not in seen_locks:
+                    seen_locks.add(n)
+                    stack.append(('lock', n))
+        keys = sum(self.region_keys[r] for r in seen_regions)
+        return seen_regions, keys, frontier
+
+    def solve(self, start, goal, max_states=MAX_STATES):
+        """ Locks to open, in order, to get from start to goal; None when it cannot be done. """
+        maze = self.maze
+        start_regions = self.start_regions(start)
+        goal_region = self.region[maze.index(*goal)]
+        if not start_regions or goal_region < 0:
+            return None
+        parent = {0: None}  # Visited lock masks, each with the mask it was opened from
+        queue = deque([0])
+        furthest = -1
+        while queue and len(parent) <= max_states:
+            opened = queue.popleft()
+            regions, keys, frontier = self.reach(start_regions, opened)
+            if goal_region in regions:
+                order = []
+                while parent[opened] is not None:
+                    previous = parent[opened]
+                    order.append((opened ^ previous).bit_length() - 1)
+                    opened = previous
+                return [self.locks[n] for n in reversed(order)]
+            if len(regions) > furthest:
+                furthest = len(regions)
+                self.blocking = [self.locks[n] for n in sorted(frontier)]
+            if keys - bin(opened).count('1') <= 0:
+                continue  # No key in hand for any lock
+            for n in frontier:
+                mask = opened | 1 << n
+                if mask not in parent:
+                    parent[mask] = opened
+                    queue.append(mask)
+        return None
+
+    def solvable(self, starts, goal):
+        return all(self.solve(start, goal) is not None for start in starts)
+
+
+def place_keys_and_locks(maze, starts, treasure, key_count=2, lock_count=2, rng=random, attempts=200):
+    """ Random key and lock cells that leave the treasure reachable from every start.
+
+    A failed layout is repaired by moving one of the locks that stopped the
+    search to another random cell, so most layouts are fixed in a step or
+    two rather than thrown away. Starts that cannot reach the treasure even
+    with no locks at all are left out, since no layout can help them.
+    Returns (keys, locks).
+    """
+    cells = [cell for cell in maze.open_cells() if cell not in starts and cell != treasure]
+    open_maze = KeyLockSolver(maze, [], [])
+    starts = [start for start in starts if open_maze.solve(start, treasure) is not None]
+    chosen = rng.sample(cells, key_count + lock_count)
+    keys, locks = chosen[:key_count], chosen[key_count:]
+    for _ in range(attempts):
+        solver = KeyLockSolver(maze, keys, locks)
+        if solver.solvable(starts, treasure):
+            return keys, locks
+        # Move a lock that blocked the search (or any lock) to a free cell
+        blocking = solver.blocking or locks
+        moving = rng.choice(blocking)
+        used = set(keys) | set(locks)
+        new_cell = rng.choice(cells)
+        while new_cell in used:
+            new_cell = rng.choice(cells)
+        locks[locks.index(moving)] = new_cell
+    raise ValueError(f"no solvable layout of {key_count} keys and {lock_count} locks found")
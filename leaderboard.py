@@ -0,0 +1,124 @@
+import os
+import sqlite3
+
+from pathfinding import DistanceField
+from replay import ReplayError, replay_maze, verify
+from simulation import WON
+
+DB_FILE = "scores.db"
+LEGACY_FILE = "scores.txt"
+
+
+class Leaderboard:
+    """ Score store shared by every game process.
+
+    SQLite in WAL mode lets several games write at once while readers keep
+    going. Boards are split by mode and maze size, and an index ordered the
+    same way as the leaderboard (fewest moves, then fastest time) makes a
+    top-k read walk only k index entries however many games are stored.
+    The old scores.txt is imported as classical 21x21 games on first use.
+
+    New scores are only accepted as replays: record() re-simulates the
+    inputs and stores the moves and time they really produce, along with
+    the replay itself so any run on the board can be watched again.
+    """
+
+    def __init__(self, path=DB_FILE, legacy_file=LEGACY_FILE):
+        self.path = path
+        self.legacy_file = legacy_file
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_schema()
+        self.import_legacy()
+
+    def create_schema(self):
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS scores (
+                id INTEGER PRIMARY KEY,
+                mode TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                cols INTEGER NOT NULL,
+                moves INTEGER NOT NULL,
+                time_taken REAL NOT NULL,
+                optimal_moves INTEGER,
+                recorded_at REAL DEFAULT (strftime('%s', 'now')),
+                replay BLOB
+            );
+            CREATE INDEX IF NOT EXISTS scores_board
+                ON scores (mode, rows, cols, moves, time_taken);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.add_replay_column()
+
+    def add_replay_column(self):
+        """ Databases from before replays were kept get the column once, guarded against racing processes. """
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(scores)")]
+            if 'replay' not in columns:
+                connection.execute("ALTER TABLE scores ADD COLUMN replay BLOB")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def import_legacy(self):
+        """ Copies scores.txt into the database once, guarded against racing processes. """
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            done = connection.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone()
+            if not done:
+                rows = []
+                with open(self.legacy_file) as file:
+                    for line in file:
+                        try:
+                            time_taken, moves, optimal_moves = map(float, line.strip().split(','))
+                        except ValueError:
+                            continue  # Skip blank or damaged lines
+                        rows.append(('classical', 21, 21, int(moves), time_taken, int(optimal_moves)))
+                connection.executemany(
+                    "INSERT INTO scores (mode, rows, cols, moves, time_taken, optimal_moves) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows)
+                connection.execute("INSERT INTO meta VALUES ('legacy_imported', ?)", (str(len(rows)),))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def record(self, replay):
+        """ Verifies a won game's replay.Replay and appends its score; a single atomic INSERT.
+
+        Returns the verified result plus the maze's optimal move count;
+        raises replay.ReplayError when the replay does not re-simulate to
+        a win.
+        """
+        result = verify(replay)
+        if result['status'] != WON:
+            raise ReplayError(f"the replay ends {result['status']}, not won")
+        maze = replay_maze(replay.rows, replay.cols, replay.maze_seed, replay.braid)
+        result['optimal_moves'] = DistanceField(maze, (maze.rows - 2, maze.cols - 2)).distance((1, 1))
+        self.connection.execute(
+            "INSERT INTO scores (mode, rows, cols, moves, time_taken, optimal_moves, replay) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (replay.mode, replay.rows, replay.cols, result['moves'], result['seconds'], result['optimal_moves'],
+             replay.to_bytes()))
+        return result
+
+    def top(self, mode, rows, cols, k=5):
+        """ Best k games on a board as (moves, time_taken), fewest moves first. """
+        return self.connection.execute(
+            "SELECT moves, time_taken FROM scores WHERE mode = ? AND rows = ? AND cols = ? "
+            "ORDER BY moves, time_taken LIMIT ?",
+            (mode, rows, cols, k)).fetchall()
+
+    def count(self, mode=None):
+        if mode is None:
+            return self.connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM scores WHERE mode = ?", (mode,)).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,430 @@
+import random
+from collections import deque
+
+# Directions shared by every game mode
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+WALL, OPEN = 0, 1
+
+
+class MazeGrid:
+    """ Compact maze storage: one byte per cell, or one bit per cell when packed. """
+
+    def __init__(self, rows, cols, packed=False):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.packed = packed
+        self.cells = bytearray((self.size + 7) // 8 if packed else self.size)
+        # Flat-index offsets matching DIRECTIONS
+        self.offsets = [dx * cols + dy for dx, dy in DIRECTIONS]
+        # Cached pathfinding.TreeIndex, dropped whenever a cell changes
+        self.tree_index = None
+        # Seed and braid fraction generate_maze built this layout from, if known;
+        # replays store them instead of the cells
+        self.seed = None
+        self.braid = 0.0
+        # Cached pathfinding.maze_kind and JumpTable, dropped whenever a cell changes
+        self.kind = None
+        self.jump_table = None
+
+    def index(self, x, y):
+        return x * self.cols + y
+
+    def position(self, i):
+        return divmod(i, self.cols)
+
+    def get(self, i):
+        if self.packed:
+            return (self.cells[i >> 3] >> (i & 7)) & 1
+        return self.cells[i]
+
+    def set(self, i, value):
+        self.tree_index = None
+        self.kind = None
+        self.jump_table = None
+        if self.packed:
+            if value:
+                self.cells[i >> 3] |= 1 << (i & 7)
+            else:
+                self.cells[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        else:
+            self.cells[i] = value
+
+    def __getitem__(self, pos):
+        x, y = pos
+        return self.get(x * self.cols + y)
+
+    def __setitem__(self, pos, value):
+        x, y = pos
+        self.set(x * self.cols + y, value)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.rows and 0 <= y < self.cols
+
+    def is_open(self, x, y):
+        """ Bounds-checked walkability test used by movement code. """
+        return 0 <= x < self.rows and 0 <= y < self.cols and self.get(x * self.cols + y) == OPEN
+
+    def neighbors(self, i):
+        """ Flat indices of the open cells next to flat index i. """
+        x, y = divmod(i, self.cols)
+        result = []
+        if x > 0 and self.get(i - self.cols):
+            result.append(i - self.cols)
+        if x < self.rows - 1 and self.get(i + self.cols):
+            result.append(i + self.cols)
+        if y > 0 and self.get(i - 1):
+            result.append(i - 1)
+        if y < self.cols - 1 and self.get(i + 1):
+            result.append(i + 1)
+        return result
+
+    def open_cells(self):
+        """ Yields (x, y) for every open cell, row by row. """
+        for i in range(self.size):
+            if self.get(i):
+                yield divmod(i, self.cols)
+
+    def nearest_open(self, x, y):
+        """ The open cell closest to (x, y) in grid steps, (x, y) itself if open; ties go to the upper, then left one. """
+        for radius in range(self.rows + self.cols):
+            for dx in range(-radius, radius + 1):
+                dy = radius - abs(dx)
+                for cy in sorted({y - dy, y + dy}):
+                    if self.is_open(x + dx, cy):
+                        return (x + dx, cy)
+        return None
+
+    def row(self, x):
+        """ One row as a bytes object of 0/1 values. """
+        if self.packed:
+            return bytes(self.get(x * self.cols + y) for y in range(self.cols))
+        return bytes(self.cells[x * self.cols:(x + 1) * self.cols])
+
+    def to_packed(self):
+        """ Returns a 1-bit-per-cell copy of this grid. """
+        if self.packed:
+            return self.copy()
+        grid = MazeGrid(self.rows, self.cols, packed=True)
+        for i in range(self.size):
+            if self.cells[i]:
+                grid.cells[i >> 3] |= 1 << (i & 7)
+        return grid
+
+    def to_unpacked(self):
+        """ Returns a 1-byte-per-cell copy of this grid. """
+        if not self.packed:
+            return self.copy()
+        grid = MazeGrid(self.rows, self.cols)
+        for i in range(self.size):
+            grid.cells[i] = self.get(i)
+        return grid
+
+    def copy(self):
+        grid = MazeGrid(self.rows, self.cols, packed=self.packed)
+        grid.cells[:] = self.cells
+        return grid
+
+    def as_array(self):
+        """ Zero-copy NumPy uint8 view of an unpacked grid, shaped (rows, cols). """
+        import numpy as np
+        if self.packed:
+            raise ValueError("as_array needs an unpacked grid, call to_unpacked() first")
+        return np.frombuffer(self.cells, dtype=np.uint8).reshape(self.rows, self.cols)
+
+    @classmethod
+    def from_lists(cls, rows_of_ints, packed=False):
+        """ Builds a grid from the old list-of-lists representation. """
+        grid = cls(len(rows_of_ints), len(rows_of_ints[0]), packed=packed)
+        for x, line in enumerate(rows_of_ints):
+            for y, value in enumerate(line):
+                if value:
+                    grid.set(x * grid.cols + y, OPEN)
+        return grid
+
+    @classmethod
+    def from_buffer(cls, rows, cols, buffer, packed=False):
+        """ Wraps an existing buffer (e.g. a memoryview of an mmap) without copying it. """
+        grid = cls(0, cols, packed=packed)
+        grid.rows = rows
+        grid.size = rows * cols
+        grid.cells = buffer
+        return grid
+
+    @classmethod
+    def from_rows(cls, maze_rows, cols, packed=False):
+        """ Builds a grid from an iterable of row bytes, e.g. generate_maze_rows. """
+        cells = bytearray()
+        for row in maze_rows:
+            cells += row
+        grid = cls(len(cells) // cols, cols)
+        grid.cells = cells
+        return grid.to_packed() if packed else grid
+
+    def to_lists(self):
+        return [list(self.row(x)) for x in range(self.rows)]
+
+
+def generate_maze(rows, cols, packed=False, seed=None, rng=None, braid=0.0):
+    """ Generates a complex maze using Prim's Algorithm.
+
+    Pass seed or a random.Random instance as rng to reproduce a layout
+    exactly. braid > 0 then removes that fraction of the dead ends (see
+    braid_maze), turning the perfect maze into a looped one.
+
+    The treasure cell (rows - 2, cols - 2) must be on the tree. Now and then
+    every neighbour of it stays a wall; carve_cells then runs again on the
+    next rng draws rather than open the treasure as an island.
+    """
+    if rng is None:
+        rng = random.Random(seed) if seed is not None else random
+    width = cols + 2
+    goal = (rows - 1) * width + cols - 1
+    cells = carve_cells(rows, cols, rng.random)
+    while not cells[goal]:
+        cells = carve_cells(rows, cols, rng.random)
+
+    grid = MazeGrid(rows, cols)
+    for x in range(rows):
+        row_start = (x + 1) * width + 1
+        grid.cells[x * cols:(x + 1) * cols] = cells[row_start:row_start + cols]
+    if braid > 0:
+        braid_maze(grid, braid, rng)
+    if packed:
+        grid = grid.to_packed()
+    grid.seed = seed
+    grid.braid = braid
+    return grid
+
+
+def carve_cells(rows, cols, random_float):
+    """ One Prim's pass; returns the cells padded with a one-cell wall border.
+
+    The frontier is a de-duplicated list with O(1) random removal (swap the
+    picked cell with the last one and pop), so a pass is linear in the maze
+    area. The treasure cell is opened the moment its first neighbour opens,
+    so when it is open it hangs off the tree by a single edge.
+    """
+    # The padding lets the hot loop skip bounds checks; the border is never
+    # opened and never enters the frontier
+    width = cols + 2
+    cells = bytearray((rows + 2) * width)
+    seen = bytearray(b"\x01" * width + (b"\x01" + bytes(cols) + b"\x01") * rows + b"\x01" * width)
+
+    start = 2 * width + 2
+    goal = (rows - 1) * width + cols - 1
+    cells[start] = OPEN
+    seen[start] = 1
+    frontier = []
+    for step in (-width, width, -1, 1):
+        if not seen[start + step]:
+            seen[start + step] = 1
+            frontier.append(start + step)
+
+    push = frontier.append
+    pop = frontier.pop
+    while frontier:
+        # Random pick with swap-with-last removal
+        last = pop()
+        pick = int(random_float() * (len(frontier) + 1))
+        if pick < len(frontier):
+            i = frontier[pick]
+            frontier[pick] = last
+        else:
+            i = last
+        # A cell is only opened on its first pop; its open-neighbour count
+        # can only grow afterwards, so re-queueing it would never help
+        up, down = i - width, i + width
+        if cells[up] + cells[down] + cells[i - 1] + cells[i + 1] == 1:
+            cells[i] = OPEN
+            if not seen[up]:
+                seen[up] = 1
+                push(up)
+            if not seen[down]:
+                seen[down] = 1
+                push(down)
+            if not seen[i - 1]:
+                seen[i - 1] = 1
+                push(i - 1)
+            if not seen[i + 1]:
+                seen[i + 1] = 1
+                push(i + 1)
+            if seen[goal] and not cells[goal]:
+                # i is the goal's first open neighbour; take the goal now, before a second one opens
+                cells[goal] = OPEN
+                for j in (goal - width, goal + width, goal - 1, goal + 1):
+                    if not seen[j]:
+                        seen[j] = 1
+                        push(j)
+    return cells
+
+
+def braid_maze(grid, fraction, rng=random):
+    """ Opens a wall beside about `fraction` of the dead ends, adding loops; returns how many were removed.
+
+    Each chosen dead end knocks through the neighbouring wall that touches
+    the most other open cells, so the new opening joins two passages
+    rather than lengthening the dead end, and clusters of openings merge
+    into small rooms. The outer border is never opened.
+    """
+    rows, cols = grid.rows, grid.cols
+    dead_ends = [i for i in range(grid.size) if grid.get(i) and len(grid.neighbors(i)) == 1]
+    rng.shuffle(dead_ends)
+    removed = 0
+    for i in dead_ends[:round(fraction * len(dead_ends))]:
+        if len(grid.neighbors(i)) != 1:
+            continue  # An earlier opening already joined it up
+        x, y = divmod(i, cols)
+        best, best_links = None, 1
+        for dx, dy in DIRECTIONS:
+            wx, wy = x + dx, y + dy
+            if 0 < wx < rows - 1 and 0 < wy < cols - 1 and not grid.get(wx * cols + wy):
+                links = len(grid.neighbors(wx * cols + wy))
+                if links > best_links or (links == best_links > 1 and rng.random() < 0.5):
+                    best, best_links = wx * cols + wy, links
+        if best is not None:
+            grid.set(best, OPEN)
+            removed += 1
+    return removed
+
+
+def generate_maze_rows(cols, rows=None, seed=None, rng=None):
+    """ Streams a perfect maze row by row using Eller's algorithm.
+
+    Yields each grid row as a bytes object of 0/1 values in the same layout
+    MazeGrid uses, so rows can be fed to MazeGrid.from_rows, MazeWindow or
+    straight to disk with write_maze_rows. Only the current row's set labels
+    are kept, so memory is proportional to cols. With rows=None the maze
+    never ends, which suits endless descent mazes.
+    """
+    if rng is None:
+        rng = random.Random(seed) if seed is not None else random
+    random_float = rng.random
+    width = (cols - 1) // 2  # logical cells per row
+    height = None if rows is None else (rows - 1) // 2
+    labels = [-1] * width
+    emitted = 0
+
+    yield bytes(cols)
+    emitted += 1
+
+    row_number = 0
+    while height is None or row_number < height:
+        last = height is not None and row_number == height - 1
+
+        # Union-find over this row's labels; fresh cells get labels of their own
+        parent = list(range(2 * width))
+        next_label = width
+        for j in range(width):
+            if labels[j] < 0:
+                labels[j] = next_label
+                next_label += 1
+
+        def find(label):
+            while parent[label] != label:
+                parent[label] = parent[parent[label]]
+                label = parent[label]
+            return label
+
+        cell_row = bytearray(cols)
+        for j in range(width):
+            cell_row[2 * j + 1] = OPEN
+        for j in range(width - 1):
+            a, b = find(labels[j]), find(labels[j + 1])
+            if a != b and (last or random_float() < 0.5):
+                parent[b] = a
+                cell_row[2 * j + 2] = OPEN
+        yield bytes(cell_row)
+        emitted += 1
+        if last:
+            break
+
+        # Every set must continue downwards through at least one cell
+        groups = {}
+        for j in range(width):
+            groups.setdefault(find(labels[j]), []).append(j)
+        down_row = bytearray(cols)
+        next_labels = [-1] * width
+        compact = 0
+        for members in groups.values():
+            going_down = [j for j in members if random_float() < 0.5]
+            if not going_down:
+                going_down = [members[int(random_float() * len(members))]]
+            for j in going_down:
+                down_row[2 * j + 1] = OPEN
+                next_labels[j] = compact
+            compact += 1
+        labels = next_labels
+        yield bytes(down_row)
+        emitted += 1
+        row_number += 1
+
+    # Closing wall rows, padding even sizes like generate_maze's border
+    while emitted < rows:
+        yield bytes(cols)
+        emitted += 1
+
+
+def write_maze_rows(file, maze_rows):
+    """ Writes streamed rows to a binary file object, returns the row count. """
+    count = 0
+    for row in maze_rows:
+        file.write(row)
+        count += 1
+    return count
+
+
+def read_maze_rows(file, cols):
+    """ Reads rows written by write_maze_rows back one at a time. """
+    while True:
+        row = file.read(cols)
+        if len(row) < cols:
+            return
+        yield row
+
+
+class MazeWindow:
+    """ Rolling view of the last few rows of a streamed maze.
+
+    Supports MazeGrid's [x, y], in_bounds, is_open, rows and cols, addressed
+    by absolute row number, while holding only `height` rows. It has no
+    flat-index methods (get, neighbors), so the pathfinding helpers need a
+    full MazeGrid; build one with MazeGrid.from_rows.
+    """
+
+    def __init__(self, maze_rows, cols, height):
+        self.source = iter(maze_rows)
+        self.cols = cols
+        self.height = height
+        self.top = 0
+        self.window = deque(maxlen=height)
+        for _ in range(height):
+            if not self.advance():
+                break
+
+    @property
+    def rows(self):
+        return self.top + len(self.window)
+
+    def advance(self):
+        """ Pulls one more row from the stream; the oldest row drops off. """
+        row = next(self.source, None)
+        if row is None:
+            return False
+        if len(self.window) == self.height:
+            self.top += 1
+        self.window.append(row)
+        return True
+
+    def __getitem__(self, pos):
+        x, y = pos
+        if not self.in_bounds(x, y):
+            raise IndexError(f"cell {pos} is outside the window (rows {self.top}..{self.rows - 1}, {self.cols} columns)")
+        return self.window[x - self.top][y]
+
+    def in_bounds(self, x, y):
+        return self.top <= x < self.top + len(self.window) and 0 <= y < self.cols
+
+    def is_open(self, x, y):
+        return self.in_bounds(x, y) and self.window[x - self.top][y] == OPEN
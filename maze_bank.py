@@ -0,0 +1,176 @@
+""" Seeded maze bank: many mazes in one memory-mapped file at 1 bit per cell.
+
+File layout (little endian):
+    header  8s magic, H version, I maze count, 2 bytes padding      (16 bytes)
+    index   per maze: Q seed, H rows, H cols, I solution length,
+            I dead-end count, Q byte offset of its cell bits        (28 bytes each)
+    data    each maze's cells packed LSB-first, the same bit layout
+            as a packed MazeGrid
+
+Opening the bank maps the file; maze(n) wraps a slice of the map in a
+packed MazeGrid without copying or parsing anything.
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+
+from maze import MazeGrid, generate_maze
+from pathfinding import DistanceField
+
+BANK_FILE = "maze_bank.bin"
+MAGIC = b"MAZEBANK"
+VERSION = 1
+HEADER = struct.Struct("<8sHI2x")
+ENTRY = struct.Struct("<QHHIIQ")
+
+
+class BankEntry:
+    def __init__(self, maze_id, seed, rows, cols, solution_length, dead_ends, offset):
+        self.maze_id = maze_id
+        self.seed = seed
+        self.rows = rows
+        self.cols = cols
+        self.solution_length = solution_length
+        self.dead_ends = dead_ends
+        self.offset = offset
+
+    @property
+    def nbytes(self):
+        return (self.rows * self.cols + 7) // 8
+
+
+def maze_stats(grid):
+    """ (solution length from (1, 1) to the treasure, dead-end count) for a maze. """
+    field = DistanceField(grid, (grid.rows - 2, grid.cols - 2))
+    distance = field.distance((1, 1))
+    solution_length = 0 if distance == float('inf') else distance
+    dead_ends = sum(1 for i in range(grid.size) if grid.get(i) and len(grid.neighbors(i)) == 1)
+    return solution_length, dead_ends
+
+
+def write_bank(path, mazes):
+    """ Writes (seed, rows, cols, solution length, dead ends, packed cell bytes) records to a bank file. """
+    entries = []
+    blobs = []
+    offset = HEADER.size + ENTRY.size * len(mazes)
+    for seed, rows, cols, solution_length, dead_ends, packed in mazes:
+        entries.append(ENTRY.pack(seed, rows, cols, solution_length, dead_ends, offset))
+        blobs.append(packed)
+        offset += len(packed)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(mazes)))
+        file.writelines(entries)
+        file.writelines(blobs)
+    return len(mazes)
+
+
+def build_bank(path, seeds, rows, cols):
+    """ Generates one maze per seed and writes them all to a bank file. """
+    mazes = []
+    for seed in seeds:
+        grid = generate_maze(rows, cols, seed=seed)
+        solution_length, dead_ends = maze_stats(grid)
+        mazes.append((seed, rows, cols, solution_length, dead_ends, grid.to_packed().cells))
+    return write_bank(path, mazes)
+
+
+class MazeBank:
+    """ Read-only, memory-mapped view of a bank file. """
+
+    def __init__(self, path=BANK_FILE):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} maze bank")
+        self.view = memoryview(self.map)
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, maze_id):
+        if not 0 <= maze_id < self.count:
+            raise IndexError(f"maze {maze_id} is not in the bank ({self.count} mazes)")
+        fields = ENTRY.unpack_from(self.map, HEADER.size + ENTRY.size * maze_id)
+        return BankEntry(maze_id, *fields)
+
+    def entries(self):
+        return [self.entry(maze_id) for maze_id in range(self.count)]
+
+    def maze(self, maze_id):
+        """ Maze number maze_id as a packed MazeGrid backed directly by the file map. """
+        entry = self.entry(maze_id)
+        cells = self.view[entry.offset:entry.offset + entry.nbytes]
+        return MazeGrid.from_buffer(entry.rows, entry.cols, cells, packed=True)
+
+    def find(self, rows, cols):
+        """ Ids of the mazes of a given size. """
+        return [entry.maze_id for entry in self.entries() if (entry.rows, entry.cols) == (rows, cols)]
+
+    def close(self):
+        """ Unmaps the file; grids returned by maze() must be dropped first. """
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+
+def bank_maze(maze_id, rows, cols, path=BANK_FILE):
+    """ Loads a banked maze for a game of the given size, unpacked for fast play. """
+    bank = MazeBank(path)
+    try:
+        entry = bank.entry(maze_id)
+        if (entry.rows, entry.cols) != (rows, cols):
+            raise ValueError(f"maze {maze_id} is {entry.rows}x{entry.cols}, the game needs {rows}x{cols}")
+        view = bank.maze(maze_id)
+        grid = view.to_unpacked()
+        grid.seed = entry.seed
+        view.cells.release()  # The map cannot close while a view of it is alive
+        return grid
+    finally:
+        bank.close()
+
+
+def maze_size(default):
+    """ Rows (= cols) for a new game: $MAZE_SIZE when set, else default. Always odd and at least 5. """
+    size = int(os.environ.get("MAZE_SIZE", default))
+    return max(5, size | 1)
+
+
+def maze_braid():
+    """ Fraction of dead ends to open into loops in fresh mazes: $MAZE_BRAID, clamped to 0..1, default 0. """
+    return min(1.0, max(0.0, float(os.environ.get("MAZE_BRAID", 0))))
+
+
+def choose_maze(rows, cols):
+    """ The maze for a new game: banked maze $MAZE_ID (from $MAZE_BANK) when set, else a fresh one.
+
+    Lets the server start everyone on the same daily or tournament maze.
+    Either way the maze comes from a known seed (maze.seed) so the game's
+    replay can rebuild it. Fresh mazes are braided by $MAZE_BRAID; banked
+    mazes are always played as stored.
+    """
+    maze_id = os.environ.get("MAZE_ID")
+    if maze_id is None:
+        return generate_maze(rows, cols, seed=random.randrange(2 ** 63), braid=maze_braid())
+    return bank_maze(int(maze_id), rows, cols, os.environ.get("MAZE_BANK", BANK_FILE))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect a maze bank file.")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("path", nargs="?", default=BANK_FILE)
+    parser.add_argument("--count", type=int, default=365)
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=21)
+    args = parser.parse_args()
+    if args.command == "build":
+        seeds = range(args.first_seed, args.first_seed + args.count)
+        print(f"Wrote {build_bank(args.path, list(seeds), args.size, args.size)} mazes to {args.path}")
+    else:
+        bank = MazeBank(args.path)
+        for entry in bank.entries():
+            print(f"{entry.maze_id}: seed={entry.seed} size={entry.rows}x{entry.cols} "
+                  f"solution={entry.solution_length} dead_ends={entry.dead_ends}")
+        bank.close()
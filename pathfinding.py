@@ -0,0 +1,525 @@
+import heapq
+from array import array
+from collections import deque
+
+from maze import DIRECTIONS
+
+NO_HOP = 255
+OPEN_AREA_SHARE = 0.2  # Share of open cells inside open 2x2 blocks above which a maze counts as 'open'
+
+
+class DistanceField:
+    """ One BFS from a goal cell, answering distance and next-step queries in O(1).
+
+    dist holds the number of moves from every cell to the goal (-1 when the
+    goal is unreachable) and hop holds the index into DIRECTIONS of the best
+    first move, both as flat arrays indexed like MazeGrid.
+    """
+
+    def __init__(self, maze, goal):
+        self.maze = maze
+        self.goal = goal
+        self.dist = array('i', [-1]) * maze.size
+        self.hop = bytearray([NO_HOP]) * maze.size
+        self.build()
+
+    def build(self):
+        maze, dist, hop = self.maze, self.dist, self.hop
+        rows, cols = maze.rows, maze.cols
+        start = maze.index(*self.goal)
+        if not maze.get(start):
+            return
+        dist[start] = 0
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            x, y = divmod(i, cols)
+            d = dist[i] + 1
+            # Stepping from the neighbour back to i is the reverse direction
+            if x > 0 and dist[i - cols] < 0 and maze.get(i - cols):
+                dist[i - cols] = d
+                hop[i - cols] = 1
+                queue.append(i - cols)
+            if x < rows - 1 and dist[i + cols] < 0 and maze.get(i + cols):
+                dist[i + cols] = d
+                hop[i + cols] = 0
+                queue.append(i + cols)
+            if y > 0 and dist[i - 1] < 0 and maze.get(i - 1):
+                dist[i - 1] = d
+                hop[i - 1] = 3
+                queue.append(i - 1)
+            if y < cols - 1 and dist[i + 1] < 0 and maze.get(i + 1):
+                dist[i + 1] = d
+                hop[i + 1] = 2
+                queue.append(i + 1)
+
+    def retarget(self, goal):
+        """ Rebuilds the field for a new goal, reusing the arrays. """
+        self.goal = goal
+        self.dist[:] = array('i', [-1]) * self.maze.size
+        self.hop[:] = bytearray([NO_HOP]) * self.maze.size
+        self.build()
+
+    def distance(self, pos):
+        """ Moves from pos to the goal, or infinity when it cannot be reached. """
+        d = self.dist[self.maze.index(*pos)]
+        return d if d >= 0 else float('inf')
+
+    def direction(self, pos):
+        """ The (dx, dy) of the best move from pos, or None at or away from the goal. """
+        code = self.hop[self.maze.index(*pos)]
+        return None if code == NO_HOP else DIRECTIONS[code]
+
+    def next_step(self, pos):
+        """ The cell one move closer to the goal, or None. """
+        step = self.direction(pos)
+        if step is None:
+            return None
+        return (pos[0] + step[0], pos[1] + step[1])
+
+    def path(self, pos):
+        """ Full path from pos to the goal, following next hops. """
+        if self.distance(pos) == float('inf'):
+            return []
+        path = [pos]
+        while pos != self.goal:
+            pos = self.next_step(pos)
+            path.append(pos)
+        return path
+
+
+def bfs_path(maze, start, goal):
+    """ Shortest path from start to goal as a list of cells, [] when unreachable. """
+    tree = tree_index(maze)
+    if tree.covers(start, goal):
+        return tree.path(start, goal)
+    cols = maze.cols
+    source, target = maze.index(*start), maze.index(*goal)
+    parent = {source: source}
+    queue = deque([source])
+    while queue:
+        i = queue.popleft()
+        if i == target:
+            path = []
+            while i != source:
+                path.append(divmod(i, cols))
+                i = parent[i]
+            path.append(start)
+            return path[::-1]
+        for j in maze.neighbors(i):
+            if j not in parent:
+                parent[j] = i
+                queue.append(j)
+    return []
+
+
+def bidirectional_bfs_path(maze, start, goal):
+    """ Shortest path from start to goal, searching from both ends at once; [] when unreachable.
+
+    Each round expands one whole layer of whichever frontier is smaller,
+    so on a maze with loops the two searches meet having visited far fewer
+    cells than one BFS spreading all the way from start.
+    """
+    cols = maze.cols
+    source, target = maze.index(*start), maze.index(*goal)
+    if not maze.get(source) or not maze.get(target):
+        return []
+    if source == target:
+        return [start]
+    # Per side: cell -> (previous cell towards that side's end, moves from that end)
+    sides = ({source: (source, 0)}, {target: (target, 0)})
+    frontiers = ([source], [target])
+    meeting = None
+    while frontiers[0] and frontiers[1] and meeting is None:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen, other = sides[side], sides[1 - side]
+        best = None
+        layer = []
+        for i in frontiers[side]:
+            d = seen[i][1] + 1
+            for j in maze.neighbors(i):
+                if j in other:
+                    length = d + other[j][1]
+                    if best is None or length < best:
+                        best, meeting = length, (i, j) if side == 0 else (j, i)
+                elif j not in seen:
+                    seen[j] = (i, d)
+                    layer.append(j)
+        frontiers = (layer, frontiers[1]) if side == 0 else (frontiers[0], layer)
+    if meeting is None:
+        return []
+    head, tail = [], []
+    i, j = meeting
+    while i != source:
+        head.append(i)
+        i = sides[0][i][0]
+    while j != target:
+        tail.append(j)
+        j = sides[1][j][0]
+    cells = [source] + head[::-1] + tail + [target]
+    return [divmod(c, cols) for c in cells]
+
+
+class JumpTable:
+    """ Precomputed jump distances for jump point search, one table per direction.
+
+    For every open cell and direction, jumps[d][i] is k > 0 when a straight
+    run from i along DIRECTIONS[d] stops at a jump point k cells away, or
+    -k when it runs k cells into a wall without finding one. A horizontal
+    run stops at a forced neighbour: an opening above or below that was
+    walled off one cell back. A vertical run stops there too, and wherever
+    a horizontal run from the cell would stop. None of this depends on the
+    goal, so it is built once per maze and jps_path checks the goal itself.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        rows, cols = maze.rows, maze.cols
+        self.jumps = [array('i', [0]) * maze.size for _ in DIRECTIONS]
+        up, down, left, right = self.jumps
+        for x in range(rows):
+            for y in range(cols - 2, -1, -1):
+                self.extend(right, x * cols + y, 1, self.forced_across(x, y + 1, 1))
+            for y in range(1, cols):
+                self.extend(left, x * cols + y, -1, self.forced_across(x, y - 1, -1))
+        for y in range(cols):
+            for x in range(rows - 2, -1, -1):
+                self.extend(down, x * cols + y, cols, self.forced_along(x + 1, y, 1))
+            for x in range(1, rows):
+                self.extend(up, x * cols + y, -cols, self.forced_along(x - 1, y, -1))
+
+    def passable(self, x, y):
+        return 0 <= x < self.maze.rows and 0 <= y < self.maze.cols and self.maze.get(x * self.maze.cols + y)
+
+    def forced_across(self, x, y, dy):
+        """ True when a horizontal run moving dy stops on open cell (x, y). """
+        passable = self.passable
+        return ((passable(x - 1, y) and not passable(x - 1, y - dy))
+                or (passable(x + 1, y) and not passable(x + 1, y - dy)))
+
+    def forced_along(self, x, y, dx):
+        """ True when a vertical run moving dx stops on open cell (x, y); needs the horizontal tables. """
+        passable = self.passable
+        i = x * self.maze.cols + y
+        return ((passable(x, y - 1) and not passable(x - dx, y - 1))
+                or (passable(x, y + 1) and not passable(x - dx, y + 1))
+                or self.jumps[2][i] > 0 or self.jumps[3][i] > 0)
+
+    def extend(self, table, i, offset, forced):
+        """ Fills table[i] from the cell one step on, which is already done. """
+        j = i + offset
+        if not self.maze.get(j):
+            table[i] = 0
+        elif forced:
+            table[i] = 1
+        else:
+            table[i] = table[j] + 1 if table[j] > 0 else table[j] - 1
+
+
+def jump_table(maze):
+    """ The maze's JumpTable, built on first use and cached on the grid. """
+    if maze.jump_table is None:
+        maze.jump_table = JumpTable(maze)
+    return maze.jump_table
+
+
+def jps_path(maze, start, goal):
+    """ Shortest path from start to goal by 4-connected jump point search; [] when unreachable.
+
+    A* over jump points only, so in rooms and wide passages whole stretches
+    of open floor are skipped instead of queued cell by cell. Each jump is
+    a lookup in the maze's JumpTable plus a check for the goal lying on
+    the run (or, for vertical runs, along the row where it crosses the
+    goal's). Runs are expanded back into cells at the end.
+    """
+    cols = maze.cols
+    if not maze.get(maze.index(*start)) or not maze.get(maze.index(*goal)):
+        return []
+    up, down, left, right = jump_table(maze).jumps
+    gx, gy = goal
+
+    def jump_across(x, y, dy):
+        k = (right if dy > 0 else left)[x * cols + y]
+        if x == gx and 0 < (gy - y) * dy <= abs(k):
+            return goal
+        return (x, y + k * dy) if k > 0 else None
+
+    def jump_along(x, y, dx):
+        k = (down if dx > 0 else up)[x * cols + y]
+        reach = abs(k)
+        steps = (gx - x) * dx
+        if 0 < steps <= reach and (k <= 0 or steps < k):
+            # Stop on the goal's row if a horizontal run from there would reach it
+            i = gx * cols + y
+            if gy == y or abs(gy - y) <= abs((right if gy > y else left)[i]):
+                return gx, y
+        return (x + k * dx, y) if k > 0 else None
+
+    def successors(cell, parent):
+        x, y = cell
+        if parent is None:
+            directions = DIRECTIONS
+        elif parent[0] == x:
+            directions = ((-1, 0), (1, 0), (0, 1 if y > parent[1] else -1))
+        else:
+            directions = ((0, -1), (0, 1), (1 if x > parent[0] else -1, 0))
+        for dx, dy in directions:
+            found = jump_along(x, y, dx) if dx else jump_across(x, y, dy)
+            if found is not None:
+                yield found
+
+    parent = {start: None}
+    cost = {start: 0}
+    heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
+    closed = set()
+    while heap:
+        _, g, cell = heapq.heappop(heap)
+        if cell == goal:
+            break
+        if cell in closed:
+            continue
+        closed.add(cell)
+        for point in successors(cell, parent[cell]):
+            step = g + abs(point[0] - cell[0]) + abs(point[1] - cell[1])
+            if point not in closed and step < cost.get(point, float('inf')):
+                cost[point] = step
+                parent[point] = cell
+                heapq.heappush(heap, (step + abs(point[0] - gx) + abs(point[1] - gy), step, point))
+    if goal not in parent:
+        return []
+    points = []
+    cell = goal
+    while cell is not None:
+        points.append(cell)
+        cell = parent[cell]
+    points.reverse()
+    path = [start]
+    for a, b in zip(points, points[1:]):
+        dx = (b[0] > a[0]) - (b[0] < a[0])
+        dy = (b[1] > a[1]) - (b[1] < a[1])
+        x, y = a
+        while (x, y) != b:
+            x, y = x + dx, y + dy
+            path.append((x, y))
+    return path
+
+
+def maze_kind(maze):
+    """ 'tree', 'braid' or 'open': the shape of the maze, for picking a solver. Cached on the grid.
+
+    A maze with no loops is a 'tree'. One with loops is 'open' when at
+    least OPEN_AREA_SHARE of its open cells lie in fully open 2x2 blocks,
+    i.e. it has rooms rather than only one-cell-wide passages.
+    """
+    if maze.kind is None:
+        if tree_index(maze).is_tree:
+            maze.kind = 'tree'
+        else:
+            rows, cols = maze.rows, maze.cols
+            in_rooms = set()
+            for x in range(rows - 1):
+                for y in range(cols - 1):
+                    i = x * cols + y
+                    if maze.get(i) and maze.get(i + 1) and maze.get(i + cols) and maze.get(i + cols + 1):
+                        in_rooms.update((i, i + 1, i + cols, i + cols + 1))
+            open_cells = sum(1 for i in range(maze.size) if maze.get(i))
+            maze.kind = 'open' if len(in_rooms) >= OPEN_AREA_SHARE * open_cells else 'braid'
+    return maze.kind
+
+
+def shortest_path(maze, start, goal):
+    """ Shortest path from start to goal with the solver that suits the maze (see maze_kind). """
+    kind = maze_kind(maze)
+    if kind == 'open':
+        return jps_path(maze, start, goal)
+    if kind == 'braid':
+        return bidirectional_bfs_path(maze, start, goal)
+    return bfs_path(maze, start, goal)
+
+
+class PursuitPath:
+    """ Hunter-to-target path that is repaired as either end moves.
+
+    Instead of searching again every tick, single steps by the target or the
+    hunter extend or trim the ends of the stored path, cutting out any loop
+    the step closes. On a perfect (tree) maze this keeps the path exactly
+    shortest forever. On mazes with loops the path can drift longer than
+    necessary, so a full search runs once it has grown by more than
+    max_detour steps since the last plan, or whenever an end jumps.
+    """
+
+    def __init__(self, maze, hunter, target, max_detour=8):
+        self.maze = maze
+        self.max_detour = max_detour
+        self.hunter = hunter
+        self.target = target
+        self.replan()
+
+    def replan(self):
+        path = shortest_path(self.maze, self.hunter, self.target)
+        self.path = deque(path or [self.hunter])
+        self.on_path = set(self.path)
+        self.slack = 0
+        self.searches = getattr(self, 'searches', 0) + 1
+
+    def reachable(self):
+        return self.path[-1] == self.target
+
+    def next_step(self):
+        """ The hunter's next cell toward the target, or None. """
+        return self.path[1] if len(self.path) > 1 and self.reachable() else None
+
+    def distance(self):
+        return len(self.path) - 1 if self.reachable() else float('inf')
+
+    def target_moved(self, pos):
+        if pos == self.target:
+            return
+        path = self.path
+        reachable = self.reachable()
+        self.target = pos
+        if not reachable or abs(pos[0] - path[-1][0]) + abs(pos[1] - path[-1][1]) != 1:
+            self.replan()
+            return
+        if pos in self.on_path:
+            # Stepped back along the path (or closed a loop): trim the tail
+            while path[-1] != pos:
+                self.on_path.discard(path.pop())
+        else:
+            path.append(pos)
+            self.on_path.add(pos)
+            self.grow()
+
+    def hunter_moved(self, pos):
+        if pos == self.hunter:
+            return
+        self.hunter = pos
+        path = self.path
+        if not self.reachable() or abs(pos[0] - path[0][0]) + abs(pos[1] - path[0][1]) != 1:
+            self.replan()
+            return
+        if pos in self.on_path:
+            # Usually the planned step: drop everything before it
+            while path[0] != pos:
+                self.on_path.discard(path.popleft())
+        else:
+            path.appendleft(pos)
+            self.on_path.add(pos)
+            self.grow()
+
+    def grow(self):
+        self.slack += 1
+        if self.slack > self.max_detour:
+            self.replan()
+
+
+class TreeIndex:
+    """ Lowest-common-ancestor index over a loop-free maze.
+
+    Prim's mazes are spanning trees of their open cells, so the distance
+    between two cells is depth(a) + depth(b) - 2 * depth(lca(a, b)). Every
+    component is rooted with one BFS, then binary-lifting tables answer
+    distance and k-th-cell-on-path queries in O(log n) without searching.
+    is_tree is False when the maze has a loop; callers must then search.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        size = maze.size
+        parent = array('i', range(size))
+        self.depth = depth = array('i', [0]) * size
+        self.component = component = array('i', [-1]) * size
+        edges = 0
+        components = 0
+        open_cells = 0
+        max_depth = 0
+        for root in range(size):
+            if component[root] >= 0 or not maze.get(root):
+                continue
+            component[root] = components
+            queue = deque([root])
+            while queue:
+                i = queue.popleft()
+                open_cells += 1
+                for j in maze.neighbors(i):
+                    edges += 1
+                    if component[j] < 0:
+                        component[j] = components
+                        parent[j] = i
+                        depth[j] = depth[i] + 1
+                        queue.append(j)
+                max_depth = max(max_depth, depth[i])
+            components += 1
+        # A forest has exactly one edge fewer than cells per component
+        self.is_tree = edges // 2 == open_cells - components
+        self.up = [parent]
+        for _ in range(max(1, max_depth.bit_length()) - 1):
+            prev = self.up[-1]
+            self.up.append(array('i', [prev[j] for j in prev]))
+
+    def covers(self, a, b):
+        """ True when the index can answer queries between cells a and b. """
+        return (self.is_tree and self.component[self.maze.index(*a)] >= 0
+                and self.component[self.maze.index(*b)] >= 0)
+
+    def ancestor(self, i, k):
+        level = 0
+        while k:
+            if k & 1:
+                i = self.up[level][i]
+            k >>= 1
+            level += 1
+        return i
+
+    def lca(self, i, j):
+        depth = self.depth
+        if depth[i] < depth[j]:
+            i, j = j, i
+        i = self.ancestor(i, depth[i] - depth[j])
+        if i == j:
+            return i
+        for table in reversed(self.up):
+            if table[i] != table[j]:
+                i, j = table[i], table[j]
+        return self.up[0][i]
+
+    def distance(self, a, b):
+        """ Moves between cells a and b, infinity across components. """
+        i, j = self.maze.index(*a), self.maze.index(*b)
+        if self.component[i] != self.component[j]:
+            return float('inf')
+        return self.depth[i] + self.depth[j] - 2 * self.depth[self.lca(i, j)]
+
+    def kth_on_path(self, a, b, k):
+        """ The cell k moves from a along the path to b (a itself for k=0). """
+        i, j = self.maze.index(*a), self.maze.index(*b)
+        top = self.lca(i, j)
+        up_steps = self.depth[i] - self.depth[top]
+        if k <= up_steps:
+            return self.maze.position(self.ancestor(i, k))
+        down_steps = self.depth[j] - self.depth[top]
+        return self.maze.position(self.ancestor(j, up_steps + down_steps - k))
+
+    def path(self, a, b):
+        """ Full path from a to b by walking both ends up to their LCA. """
+        i, j = self.maze.index(*a), self.maze.index(*b)
+        if self.component[i] != self.component[j]:
+            return []
+        top = self.lca(i, j)
+        parent = self.up[0]
+        head, tail = [], []
+        while i != top:
+            head.append(i)
+            i = parent[i]
+        while j != top:
+            tail.append(j)
+            j = parent[j]
+        cells = head + [top] + tail[::-1]
+        return [self.maze.position(c) for c in cells]
+
+
+def tree_index(maze):
+    """ The maze's TreeIndex, built on first use and cached on the grid. """
+    if maze.tree_index is None:
+        maze.tree_index = TreeIndex(maze)
+    return maze.tree_index
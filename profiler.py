@@ -0,0 +1,170 @@
+""" Opt-in per-frame phase timing for the game loops.
+
+Each loop calls begin_frame() at the top and mark(phase) after each phase
+(input, enemy, draw, present). Profiling is off unless $MAZE_PROFILE names
+a trace file, in which case:
+
+    * the last WINDOW durations of every phase are kept for rolling
+      p50/p95/p99 figures,
+    * $MAZE_PROFILE_OVERLAY=1 draws those figures in the corner of the game,
+    * on exit the frames are written as a Chrome trace_event JSON file
+      (open it in chrome://tracing or https://ui.perfetto.dev) and a
+      summary is printed to stderr.
+
+    MAZE_PROFILE=trace.json MAZE_PROFILE_OVERLAY=1 python hard_mode.py
+"""
+import atexit
+import json
+import os
+import sys
+import time
+from collections import deque
+
+WINDOW = 300  # Frames kept for rolling percentiles
+MAX_EVENTS = 200000  # Trace events kept; the oldest are dropped after this
+OVERLAY_EVERY = 10  # Frames between overlay text refreshes
+
+
+def percentile(ordered, p):
+    """ Nearest-rank percentile of an already sorted list. """
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class FrameProfiler:
+    """ Records how long each phase of each frame took. """
+
+    enabled = True
+
+    def __init__(self, name, trace_path=None, overlay=False, window=WINDOW):
+        self.name = name
+        self.trace_path = trace_path
+        self.overlay = overlay
+        self.window = window
+        self.phases = {}  # phase -> deque of recent durations in seconds
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.origin = time.perf_counter()
+        self.frame_start = None
+        self.last = None
+        self.frames = 0
+        self.overlay_surface = None
+        self.font = None
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.record("frame", self.frame_start, now)
+        self.frame_start = self.last = now
+        self.frames += 1
+
+    def mark(self, phase):
+        """ Ends `phase`, which started at the previous mark (or the start of the frame). """
+        if self.last is None:
+            return
+        now = time.perf_counter()
+        self.record(phase, self.last, now)
+        self.last = now
+
+    def record(self, phase, start, end):
+        durations = self.phases.get(phase)
+        if durations is None:
+            durations = self.phases[phase] = deque(maxlen=self.window)
+        durations.append(end - start)
+        # Chrome trace "complete" events, in microseconds since the profiler started
+        self.events.append((phase, (start - self.origin) * 1e6, (end - start) * 1e6))
+
+    def stats(self):
+        """ Rolling {phase: (p50, p95, p99, max)} in milliseconds. """
+        result = {}
+        for phase, durations in self.phases.items():
+            ordered = sorted(durations)
+            result[phase] = tuple(value * 1000 for value in (
+                percentile(ordered, 50), percentile(ordered, 95), percentile(ordered, 99), ordered[-1]))
+        return result
+
+    def draw_overlay(self, screen, layer=None):
+        """ Draws the rolling percentiles top-right; through layer so dirty rects stay correct. """
+        if not self.overlay:
+            return
+        import pygame
+        if self.overlay_surface is None or self.frames % OVERLAY_EVERY == 0:
+            if self.font is None:
+                self.font = pygame.font.SysFont("Consolas", 13)
+            lines = [f"{'phase':<8} {'p50':>6} {'p95':>6} {'p99':>6}"]
+            for phase, (p50, p95, p99, _) in self.stats().items():
+                lines.append(f"{phase:<8} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+            rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+            width = max(surface.get_width() for surface in rendered) + 8
+            height = sum(surface.get_height() for surface in rendered) + 8
+            self.overlay_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            self.overlay_surface.fill((0, 0, 0, 170))
+            y = 4
+            for surface in rendered:
+                self.overlay_surface.blit(surface, (4, y))
+                y += surface.get_height()
+        pos = (screen.get_width() - self.overlay_surface.get_width() - 4, 4)
+        if layer is not None:
+            layer.blit(screen, self.overlay_surface, pos)
+        else:
+            screen.blit(self.overlay_surface, pos)
+
+    def trace(self):
+        """ The recorded frames in Chrome trace_event format. """
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": self.name}}]
+        for phase, ts, dur in self.events:
+            # Whole frames on one track, their phases nested on another
+            events.append({"name": phase, "cat": "frame", "ph": "X", "pid": pid,
+                           "tid": 0 if phase == "frame" else 1, "ts": round(ts, 1), "dur": round(dur, 1)})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path=None):
+        path = path or self.trace_path
+        if not path or not self.events:
+            return
+        with open(path, "w") as file:
+            json.dump(self.trace(), file)
+
+    def summary(self):
+        lines = [f"{self.name}: {self.frames} frames (ms, last {self.window})"]
+        for phase, (p50, p95, p99, worst) in self.stats().items():
+            lines.append(f"  {phase:<8} p50 {p50:7.2f}  p95 {p95:7.2f}  p99 {p99:7.2f}  max {worst:7.2f}")
+        return "\n".join(lines)
+
+    def close(self):
+        """ Writes the trace and prints the summary; registered with atexit. """
+        if self.frames:
+            self.write_trace()
+            print(self.summary(), file=sys.stderr)
+            if self.trace_path:
+                print(f"  trace written to {self.trace_path}", file=sys.stderr)
+        self.frames = 0
+
+
+class NullProfiler:
+    """ Stand-in used when profiling is off; every call is a no-op. """
+
+    enabled = False
+
+    def begin_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def draw_overlay(self, screen, layer=None):
+        pass
+
+    def close(self):
+        pass
+
+
+def frame_profiler(name):
+    """ A FrameProfiler when $MAZE_PROFILE is set, else a NullProfiler. """
+    trace_path = os.environ.get("MAZE_PROFILE")
+    if not trace_path:
+        return NullProfiler()
+    profiler = FrameProfiler(name, trace_path, overlay=os.environ.get("MAZE_PROFILE_OVERLAY") == "1")
+    atexit.register(profiler.close)
+    return profiler
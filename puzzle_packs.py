@@ -0,0 +1,190 @@
+""" Builds difficulty-ranked puzzle packs from thousands of seeded mazes.
+
+    python puzzle_packs.py --count 100000 --size 21 --output packs
+
+Seeds are generated in chunks on a process pool. Each chunk is stacked
+into one (mazes, rows, cols) NumPy array and measured all at once:
+neighbour counts come from convolving the open cells with a plus-shaped
+kernel (four shifted adds), and dead ends, junctions, branching factor,
+corridor lengths and the solution length are all array operations over
+the whole chunk rather than Python loops over cells.
+
+The catalogue is ranked by a difficulty score and cut into equal easy,
+medium and hard packs. Each pack is an ordinary maze bank file, easiest
+maze first, so a game can play one with $MAZE_BANK and $MAZE_ID.
+catalogue.npz keeps every maze's seed, metrics, score and pack.
+"""
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from maze import generate_maze
+from maze_bank import write_bank
+
+PACKS = ('easy', 'medium', 'hard')
+CHUNK_SIZE = 500  # Mazes generated and measured per pool task
+CORRIDOR_BINS = [1, 2, 3, 5, 9, 17]  # Lower edges of the corridor-length histogram buckets
+# Difficulty is a weighted sum of percentile ranks within the catalogue
+DIFFICULTY_WEIGHTS = {'solution_length': 0.5, 'dead_ends': 0.25, 'branching_factor': 0.25}
+
+
+def neighbour_counts(open_cells):
+    """ Open neighbours of every open cell (0 on walls), for a (mazes, rows, cols) 0/1 array. """
+    padded = np.pad(open_cells, ((0, 0), (1, 1), (1, 1)))
+    counts = padded[:, :-2, 1:-1] + padded[:, 2:, 1:-1] + padded[:, 1:-1, :-2] + padded[:, 1:-1, 2:]
+    return counts * open_cells
+
+
+def grow(reached):
+    """ reached plus every cell next to it: a boolean dilation by the plus-shaped kernel. """
+    grown = reached.copy()
+    grown[:, 1:] |= reached[:, :-1]
+    grown[:, :-1] |= reached[:, 1:]
+    grown[:, :, 1:] |= reached[:, :, :-1]
+    grown[:, :, :-1] |= reached[:, :, 1:]
+    return grown
+
+
+def solution_lengths(open_cells, start, goal):
+    """ Shortest path length from start to goal in every maze (0 when unreachable).
+
+    A breadth-first wavefront grown from goal in all mazes at once; mazes
+    drop out of the batch as soon as the wave reaches start or stops growing.
+    """
+    passable = open_cells.astype(bool)
+    lengths = np.zeros(len(open_cells), dtype=np.int64)
+    if start == goal:
+        return lengths
+    active = np.flatnonzero(passable[:, goal[0], goal[1]] & passable[:, start[0], start[1]])
+    passable = passable[active]
+    wave = np.zeros_like(passable)
+    wave[:, goal[0], goal[1]] = True
+    steps = 0
+    while active.size:
+        steps += 1
+        grown = grow(wave) & passable
+        arrived = grown[:, start[0], start[1]]
+        stalled = (grown == wave).all(axis=(1, 2))
+        lengths[active[arrived]] = steps
+        keep = ~(arrived | stalled)
+        active, wave, passable = active[keep], grown[keep], passable[keep]
+    return lengths
+
+
+def corridor_histograms(counts):
+    """ Per maze, how many corridors fall in each CORRIDOR_BINS length bucket.
+
+    A corridor is a connected run of cells with exactly two open
+    neighbours, i.e. passage with no choice to make. Runs are labelled by
+    spreading the smallest cell index along them until nothing changes.
+    """
+    mazes, rows, cols = counts.shape
+    corridor = counts == 2
+    big = mazes * rows * cols
+    labels = np.where(corridor, np.arange(big).reshape(counts.shape), big)
+    while True:
+        padded = np.pad(labels, ((0, 0), (1, 1), (1, 1)), constant_values=big)
+        spread = np.minimum.reduce([labels, padded[:, :-2, 1:-1], padded[:, 2:, 1:-1],
+                                    padded[:, 1:-1, :-2], padded[:, 1:-1, 2:]])
+        spread = np.where(corridor, spread, big)
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    runs, lengths = np.unique(labels[corridor], return_counts=True)
+    maze_of_run = runs // (rows * cols)
+    bucket = np.searchsorted(CORRIDOR_BINS, lengths, side='right') - 1
+    flat = np.bincount(maze_of_run * len(CORRIDOR_BINS) + bucket, minlength=mazes * len(CORRIDOR_BINS))
+    return flat.reshape(mazes, len(CORRIDOR_BINS))
+
+
+def maze_metrics(open_cells):
+    """ Difficulty metrics for a (mazes, rows, cols) 0/1 array, one value per maze. """
+    _, rows, cols = open_cells.shape
+    counts = neighbour_counts(open_cells)
+    junctions = counts >= 3
+    junction_count = junctions.sum(axis=(1, 2))
+    # Ways on from a junction, not counting the way in
+    exits = np.where(junctions, counts - 1, 0).sum(axis=(1, 2))
+    return {
+        'solution_length': solution_lengths(open_cells, (1, 1), (rows - 2, cols - 2)),
+        'dead_ends': (counts == 1).sum(axis=(1, 2)),
+        'junctions': junction_count,
+        'branching_factor': np.divide(exits, junction_count, out=np.zeros(len(open_cells)), where=junction_count > 0),
+        'corridor_histogram': corridor_histograms(counts),
+    }
+
+
+def build_chunk(job):
+    """ Worker entry point: generates and measures one chunk of seeds. """
+    first_seed, count, rows, cols = job
+    seeds = np.arange(first_seed, first_seed + count, dtype=np.uint64)
+    cells = np.empty((count, rows, cols), dtype=np.uint8)
+    for n, seed in enumerate(range(first_seed, first_seed + count)):
+        cells[n] = generate_maze(rows, cols, seed=seed).as_array()
+    metrics = maze_metrics(cells)
+    metrics['seed'] = seeds
+    # Same LSB-first bit layout as a packed MazeGrid, ready for a bank file
+    metrics['packed'] = np.packbits(cells.reshape(count, -1), axis=1, bitorder='little')
+    return metrics
+
+
+def difficulty_scores(catalogue):
+    """ Weighted percentile ranks of the DIFFICULTY_WEIGHTS metrics, from 0 (easiest) to 1. """
+    count = len(catalogue['seed'])
+    score = np.zeros(count)
+    for name, weight in DIFFICULTY_WEIGHTS.items():
+        ranks = np.argsort(np.argsort(catalogue[name], kind='stable'), kind='stable')
+        score += weight * ranks / max(1, count - 1)
+    return score
+
+
+def build_catalogue(count, rows, cols, first_seed=0, processes=None, chunk_size=CHUNK_SIZE):
+    """ Metrics for `count` seeded mazes, measured chunk by chunk across a process pool. """
+    jobs = [(seed, min(chunk_size, first_seed + count - seed), rows, cols)
+            for seed in range(first_seed, first_seed + count, chunk_size)]
+    with Pool(processes) as pool:
+        chunks = pool.map(build_chunk, jobs)
+    catalogue = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+    catalogue['difficulty'] = difficulty_scores(catalogue)
+    return catalogue
+
+
+def write_packs(catalogue, rows, cols, directory):
+    """ Splits the catalogue into equal PACKS by difficulty and writes a bank file per pack. """
+    os.makedirs(directory, exist_ok=True)
+    order = np.argsort(catalogue['difficulty'], kind='stable')
+    pack = np.empty(len(order), dtype=np.uint8)
+    paths = {}
+    for number, (name, members) in enumerate(zip(PACKS, np.array_split(order, len(PACKS)))):
+        pack[members] = number
+        mazes = [(int(catalogue['seed'][i]), rows, cols, int(catalogue['solution_length'][i]),
+                  int(catalogue['dead_ends'][i]), catalogue['packed'][i].tobytes()) for i in members]
+        paths[name] = os.path.join(directory, f"{name}.bin")
+        write_bank(paths[name], mazes)
+    catalogue['pack'] = pack
+    fields = {name: values for name, values in catalogue.items() if name != 'packed'}
+    np.savez_compressed(os.path.join(directory, "catalogue.npz"), rows=rows, cols=cols, **fields)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build difficulty-ranked maze packs.")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=21)
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--output", default="packs")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    catalogue = build_catalogue(args.count, args.size, args.size, args.first_seed, args.processes)
+    paths = write_packs(catalogue, args.size, args.size, args.output)
+    print(f"Measured {args.count} mazes in {time.perf_counter() - started:.1f}s")
+    for number, name in enumerate(PACKS):
+        members = catalogue['pack'] == number
+        print(f"{name}: {members.sum()} mazes in {paths[name]}, "
+              f"solution {catalogue['solution_length'][members].mean():.1f}, "
+              f"dead ends {catalogue['dead_ends'][members].mean():.1f}, "
+              f"branching {catalogue['branching_factor'][members].mean():.2f}")
@@ -0,0 +1,289 @@
+import pygame
+from collections import OrderedDict
+
+
+class MazeLayer:
+    """ Pre-rendered maze plus dirty-rectangle bookkeeping for the game loops.
+
+    The walls never change after generation, so the whole static frame
+    (background, maze cells and any fixed decorations) is drawn once to an
+    off-screen surface. Each frame only the rectangles covered by last
+    frame's sprites and HUD text are restored from it, the new sprites are
+    drawn, and present() pushes just those rectangles to the display.
+    """
+
+    def __init__(self, maze, cell_size, top_margin, size, background, wall, floor, radius=6):
+        self.maze = maze
+        self.cell_size = cell_size
+        self.top_margin = top_margin
+        self.surface = pygame.Surface(size)
+        # background is a colour or a function that paints the surface;
+        # floor=None leaves open cells showing the background
+        if callable(background):
+            background(self.surface)
+        else:
+            self.surface.fill(background)
+        for x in range(maze.rows):
+            for y in range(maze.cols):
+                rect = (y * cell_size, x * cell_size + top_margin, cell_size, cell_size)
+                if maze[x, y] == 0:
+                    pygame.draw.rect(self.surface, wall, rect, border_radius=radius)
+                elif floor is not None:
+                    pygame.draw.rect(self.surface, floor, rect, border_radius=radius)
+        self.previous = []  # Rects drawn last frame, restored next frame
+        self.current = []
+        self.dirty = []
+        self.full_redraw = True
+
+    def cell_rect(self, pos):
+        return pygame.Rect(pos[1] * self.cell_size, pos[0] * self.cell_size + self.top_margin,
+                           self.cell_size, self.cell_size)
+
+    def bake(self, image, pos):
+        """ Draws a decoration that never moves straight into the static layer. """
+        self.surface.blit(image, pos)
+        self.full_redraw = True
+
+    def begin_frame(self, screen):
+        """ Erases last frame's sprites by copying the static layer back over them. """
+        if self.full_redraw:
+            screen.blit(self.surface, (0, 0))
+            self.dirty = [screen.get_rect()]
+            self.full_redraw = False
+        else:
+            for rect in self.previous:
+                screen.blit(self.surface, rect, rect)
+            self.dirty = self.previous
+        self.current = []
+
+    def blit(self, screen, image, pos):
+        rect = screen.blit(image, pos)
+        self.current.append(rect)
+        return rect
+
+    def rect(self, screen, color, rect, border_radius=0):
+        rect = pygame.draw.rect(screen, color, rect, border_radius=border_radius)
+        self.current.append(rect)
+        return rect
+
+    def present(self):
+        """ Updates only the rectangles that changed since the last frame. """
+        pygame.display.update(self.dirty + self.current)
+        self.previous = self.current
+        self.current = []
+
+    def follow(self, pos):
+        """ The whole maze is always on screen; nothing to scroll. """
+
+    # Maze-space sprites are already in screen space when nothing scrolls
+    blit_world = blit
+
+
+class ScrollingMazeLayer:
+    """ Camera over a maze bigger than the window, drawn from cached chunks.
+
+    The maze is cut into chunk_cells x chunk_cells squares, each rendered to
+    its own surface the first time it scrolls into view and kept in an LRU
+    cache sized to a few screens. A frame blits only the chunks that meet
+    the viewport, so drawing costs the same for a 21x21 maze as a 1001x1001
+    one. While the camera is still, frames take the same dirty-rectangle
+    path as MazeLayer; a camera move recomposes the view and repaints it.
+
+    Positions given to bake() and blit_world() are in the same layout
+    MazeLayer uses (column * cell_size, row * cell_size + top_margin); the
+    layer applies the camera offset.
+    """
+
+    def __init__(self, maze, cell_size, top_margin, size, background, wall, floor, radius=6,
+                 chunk_cells=16, dead_zone=0.3):
+        self.maze = maze
+        self.cell_size = cell_size
+        self.top_margin = top_margin
+        self.wall = wall
+        self.floor = floor
+        self.radius = radius
+        self.chunk_cells = chunk_cells
+        self.chunk_size = chunk_cells * cell_size
+        self.viewport = pygame.Rect(0, top_margin, size[0], size[1] - top_margin)
+        self.world_size = (maze.cols * cell_size, maze.rows * cell_size)
+        # The player can wander this fraction of the viewport from its centre before it scrolls
+        self.dead_zone = (int(self.viewport.width * dead_zone / 2), int(self.viewport.height * dead_zone / 2))
+        self.backdrop = pygame.Surface(size)
+        if callable(background):
+            background(self.backdrop)
+            self.chunk_fill = None  # Open cells stay see-through to the backdrop
+        else:
+            self.backdrop.fill(background)
+            self.chunk_fill = background
+        self.view = pygame.Surface(size)
+        across = self.viewport.width // self.chunk_size + 2
+        down = self.viewport.height // self.chunk_size + 2
+        self.max_chunks = across * down * 3
+        self.chunks = OrderedDict()
+        self.decorations = []
+        self.camera = (0, 0)
+        self.composed = None  # Camera position self.view was composed for
+        self.previous = []
+        self.current = []
+        self.dirty = []
+        self.full_redraw = True
+
+    def chunk(self, cx, cy):
+        """ Chunk (column, row) of the maze as a surface, rendered on first use. """
+        surface = self.chunks.get((cx, cy))
+        if surface is not None:
+            self.chunks.move_to_end((cx, cy))
+            return surface
+        cell_size, maze = self.cell_size, self.maze
+        surface = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA if self.chunk_fill is None else 0)
+        if self.chunk_fill is not None:
+            surface.fill(self.chunk_fill)
+        top, left = cy * self.chunk_cells, cx * self.chunk_cells
+        for x in range(top, min(top + self.chunk_cells, maze.rows)):
+            row = maze.row(x)
+            for y in range(left, min(left + self.chunk_cells, maze.cols)):
+                rect = ((y - left) * cell_size, (x - top) * cell_size, cell_size, cell_size)
+                if not row[y]:
+                    pygame.draw.rect(surface, self.wall, rect, border_radius=self.radius)
+                elif self.floor is not None:
+                    pygame.draw.rect(surface, self.floor, rect, border_radius=self.radius)
+        origin = (cx * self.chunk_size, cy * self.chunk_size)
+        for image, (px, py) in self.decorations:
+            surface.blit(image, (px - origin[0], py - origin[1]))
+        self.chunks[(cx, cy)] = surface
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return surface
+
+    def bake(self, image, pos):
+        """ Adds a decoration that never moves to every chunk it overlaps. """
+        self.decorations.append((image, (pos[0], pos[1] - self.top_margin)))
+        self.chunks.clear()
+        self.composed = None
+
+    def follow(self, pos):
+        """ Scrolls so the cell at pos stays inside the dead zone around the viewport centre. """
+        cx = pos[1] * self.cell_size + self.cell_size // 2
+        cy = pos[0] * self.cell_size + self.cell_size // 2
+        camera_x, camera_y = self.camera
+        half_w, half_h = self.viewport.width // 2, self.viewport.height // 2
+        zone_w, zone_h = self.dead_zone
+        camera_x = min(max(camera_x, cx - half_w - zone_w), cx - half_w + zone_w)
+        camera_y = min(max(camera_y, cy - half_h - zone_h), cy - half_h + zone_h)
+        camera_x = max(0, min(camera_x, self.world_size[0] - self.viewport.width))
+        camera_y = max(0, min(camera_y, self.world_size[1] - self.viewport.height))
+        self.camera = (camera_x, camera_y)
+
+    def compose(self):
+        """ Rebuilds the view surface from the chunks meeting the viewport. """
+        camera_x, camera_y = self.camera
+        self.view.blit(self.backdrop, (0, 0))
+        self.view.set_clip(self.viewport)
+        size = self.chunk_size
+        first_cx, first_cy = camera_x // size, camera_y // size
+        last_cx = min((camera_x + self.viewport.width - 1) // size, (self.maze.cols - 1) // self.chunk_cells)
+        last_cy = min((camera_y + self.viewport.height - 1) // size, (self.maze.rows - 1) // self.chunk_cells)
+        for cy in range(first_cy, last_cy + 1):
+            for cx in range(first_cx, last_cx + 1):
+                self.view.blit(self.chunk(cx, cy), (cx * size - camera_x, cy * size - camera_y + self.top_margin))
+        self.view.set_clip(None)
+        self.composed = self.camera
+        self.full_redraw = True
+
+    def cell_rect(self, pos):
+        return pygame.Rect(pos[1] * self.cell_size - self.camera[0],
+                           pos[0] * self.cell_size + self.top_margin - self.camera[1],
+                           self.cell_size, self.cell_size)
+
+    def begin_frame(self, screen):
+        """ Erases last frame's sprites, or repaints everything if the camera moved. """
+        if self.composed != self.camera:
+            self.compose()
+        if self.full_redraw:
+            screen.blit(self.view, (0, 0))
+            self.dirty = [screen.get_rect()]
+            self.full_redraw = False
+        else:
+            for rect in self.previous:
+                screen.blit(self.view, rect, rect)
+            self.dirty = self.previous
+        self.current = []
+
+    def blit(self, screen, image, pos):
+        """ Blits in screen space, e.g. HUD text. """
+        rect = screen.blit(image, pos)
+        self.current.append(rect)
+        return rect
+
+    def blit_world(self, screen, image, pos):
+        """ Blits a sprite at a maze-space position; sprites outside the viewport are skipped. """
+        rect = image.get_rect(topleft=(pos[0] - self.camera[0], pos[1] - self.camera[1]))
+        if not rect.colliderect(self.viewport):
+            return None
+        screen.set_clip(self.viewport)
+        rect = screen.blit(image, rect)
+        screen.set_clip(None)
+        self.current.append(rect)
+        return rect
+
+    def rect(self, screen, color, rect, border_radius=0):
+        """ Draws a maze cell highlight (from cell_rect), clipped to the viewport. """
+        screen.set_clip(self.viewport)
+        rect = pygame.draw.rect(screen, color, rect, border_radius=border_radius)
+        screen.set_clip(None)
+        self.current.append(rect)
+        return rect
+
+    def present(self):
+        pygame.display.update(self.dirty + self.current)
+        self.previous = self.current
+        self.current = []
+
+
+def make_maze_layer(maze, cell_size, top_margin, size, background, wall, floor, radius=6):
+    """ A MazeLayer when the maze fits in the window, else a ScrollingMazeLayer. """
+    if maze.cols * cell_size <= size[0] and maze.rows * cell_size <= size[1] - top_margin:
+        return MazeLayer(maze, cell_size, top_margin, size, background, wall, floor, radius)
+    return ScrollingMazeLayer(maze, cell_size, top_margin, size, background, wall, floor, radius)
+
+
+class SurfaceCache:
+    """ LRU cache of rendered text surfaces.
+
+    Text is keyed by (text, font, colour), so a steady-state frame reuses
+    surfaces instead of calling font.render again.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def lookup(self, key, make):
+        surface = self.entries.get(key)
+        if surface is None:
+            surface = make()
+            self.entries[key] = surface
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return surface
+
+    def text(self, font, text, color):
+        return self.lookup(('text', text, font, color), lambda: font.render(text, True, color))
+
+    def glyph_text(self, font, text, color):
+        """ A fast-changing string (e.g. a timer) built from cached per-character glyphs.
+
+        Only the glyphs are cached. The assembled string is new almost every
+        frame, so caching it would just push useful entries out of the LRU.
+        """
+        glyphs = [self.text(font, char, color) for char in text]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max((glyph.get_height() for glyph in glyphs), default=font.get_height())
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        return surface
@@ -0,0 +1,336 @@
+""" Compact binary game replays: recording, headless verification and playback.
+
+A replay holds everything needed to play a game again: the mode and maze
+size, the seed and braid fraction the maze was generated from, the seed of the game's own
+random.Random (enemy random moves, key and lock placement), every player
+input and every enemy step, each tagged with the tick it happened in.
+Ticks are the fixed steps simulation.Simulation counts (frames in
+classical and friends mode, enemy decisions in hard mode, 100 ms steps in
+easy mode), so feeding the inputs back through a Simulation reproduces
+the game exactly.
+
+The live enemy plans on a background thread and may act on a plan a step
+or two old, so its moves are recorded rather than recomputed. The
+simulation replays them and checks each one against the rules: random
+moves must be the ones the seeded generator picks, and chase moves must
+follow the simulation's own plan or another shortest path to the player.
+A few stale-plan steps are expected; more than MAX_ENEMY_DEVIATION of
+the enemy's decisions is not a real game.
+
+File layout (little endian):
+    header  4s magic, B version, B mode, H rows, H cols, Q maze seed,
+            d braid, Q rng seed, H tick rate, I end tick,
+            I event count                                             (44 bytes)
+    events  one unsigned LEB128 varint per input or enemy step:
+            (tick - previous tick) << 4 | actor << 2 | direction
+
+direction indexes maze.DIRECTIONS and actor is 0 for the player (red in
+friends mode), 1 for friends mode's blue player and ENEMY_ACTOR for the
+enemy. Events are rarely more than a few ticks apart, so a typical game
+is a byte or two per move.
+"""
+import argparse
+import os
+import struct
+import time
+from functools import lru_cache
+from multiprocessing import Pool
+
+from maze import DIRECTIONS, generate_maze
+from simulation import PLAYING, ENEMY_SPEED, Simulation
+
+MAGIC = b"MZRP"
+VERSION = 3
+HEADER = struct.Struct("<4sBBHHQdQHII")
+MODES = ('classical', 'easy', 'hard', 'friends')
+LETTERS = 'UDLR'  # MOVES letter for each index of maze.DIRECTIONS
+REPLAY_DIR = "replays"
+MAX_INPUTS_PER_SECOND = 40  # Faster than anyone presses keys; more than this in one tick is not a human game
+MAX_GAME_SECONDS = 3600  # Longer replays are refused rather than simulated
+HOLD_SECONDS = 2  # Playback keeps the final position on screen this long
+ENEMY_ACTOR = 2
+MAX_ENEMY_DEVIATION = 0.2  # Share of enemy decisions allowed to act on a stale plan
+
+
+class ReplayError(ValueError):
+    """ A replay that cannot be decoded, or does not hold up when re-simulated. """
+
+
+class Replay:
+    def __init__(self, mode, rows, cols, maze_seed, rng_seed, tick_rate, events=None, end_tick=0, braid=0.0):
+        if mode not in MODES:
+            raise ReplayError(f"unknown mode {mode!r}")
+        self.mode = mode
+        self.rows = rows
+        self.cols = cols
+        self.maze_seed = maze_seed
+        self.braid = braid
+        self.rng_seed = rng_seed
+        self.tick_rate = tick_rate
+        self.events = events if events is not None else []  # (tick, actor, direction index)
+        self.end_tick = end_tick
+
+    @classmethod
+    def for_game(cls, mode, maze, rng_seed, tick_rate):
+        """ An empty replay for a game about to start on maze (from maze_bank.choose_maze). """
+        if maze.seed is None:
+            raise ValueError("the maze has no seed; build it with generate_maze(seed=...) to record a replay")
+        return cls(mode, maze.rows, maze.cols, maze.seed, rng_seed, tick_rate, braid=maze.braid)
+
+    def record(self, tick, step, player=0):
+        """ Logs one input: step is a (dx, dy) from DIRECTIONS, applied during `tick`. """
+        self.events.append((tick, player, DIRECTIONS.index(step)))
+        self.end_tick = max(self.end_tick, tick)
+
+    def record_enemy(self, tick, step):
+        """ Logs the enemy stepping by (dx, dy) in `tick`. """
+        self.record(tick, step, ENEMY_ACTOR)
+
+    def finish(self, tick):
+        """ Marks the tick the game ended on, so playback shows what happened after the last input. """
+        self.end_tick = max(self.end_tick, tick)
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, MODES.index(self.mode), self.rows, self.cols,
+                                    self.maze_seed, self.braid, self.rng_seed, self.tick_rate, self.end_tick,
+                                    len(self.events)))
+        previous = 0
+        for tick, actor, direction in self.events:
+            value = (tick - previous) << 4 | actor << 2 | direction
+            previous = tick
+            while value >= 0x80:
+                out.append(value & 0x7f | 0x80)
+                value >>= 7
+            out.append(value)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("replay is shorter than its header")
+        magic, version, mode, rows, cols, maze_seed, braid, rng_seed, tick_rate, end_tick, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError(f"not a version {VERSION} replay")
+        if mode >= len(MODES):
+            raise ReplayError(f"unknown mode number {mode}")
+        events = []
+        tick = 0
+        pos = HEADER.size
+        for _ in range(count):
+            value = shift = 0
+            while True:
+                if pos >= len(data):
+                    raise ReplayError("replay ends in the middle of an event")
+                byte = data[pos]
+                pos += 1
+                value |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            tick += value >> 4
+            events.append((tick, value >> 2 & 3, value & 3))
+        if pos != len(data):
+            raise ReplayError("trailing bytes after the last event")
+        if not 0 <= braid <= 1:
+            raise ReplayError(f"braid fraction {braid} is outside 0..1")
+        return cls(MODES[mode], rows, cols, maze_seed, rng_seed, tick_rate, events, end_tick, braid)
+
+    def save(self, directory=REPLAY_DIR):
+        """ Writes the replay to a new file in directory and returns its path. """
+        os.makedirs(directory, exist_ok=True)
+        name = f"{self.mode}-{time.strftime('%Y%m%d-%H%M%S')}-{self.maze_seed:016x}.mzr"
+        path = os.path.join(directory, name)
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+    def inputs(self):
+        """ Simulation inputs per tick: {tick: [input, ...]} in the order they were made. """
+        by_tick = {}
+        friends = self.mode == 'friends'
+        for tick, player, direction in self.events:
+            if player == ENEMY_ACTOR:
+                continue
+            letter = LETTERS[direction]
+            if player > 1:
+                raise ReplayError(f"unknown actor {player}")
+            if friends:
+                move = (None, letter) if player else (letter, None)
+            elif player:
+                raise ReplayError(f"second player input in a {self.mode} game")
+            else:
+                move = letter
+            by_tick.setdefault(tick, []).append(move)
+        return by_tick
+
+    def enemy_moves(self):
+        """ The recorded enemy steps: {tick: (dx, dy)}. """
+        moves = {}
+        for tick, actor, direction in self.events:
+            if actor != ENEMY_ACTOR:
+                continue
+            if self.mode not in ('easy', 'hard'):
+                raise ReplayError(f"enemy move in a {self.mode} game")
+            if tick in moves:
+                raise ReplayError(f"two enemy moves in tick {tick}")
+            moves[tick] = DIRECTIONS[direction]
+        return moves
+
+    def simulation(self):
+        """ A fresh Simulation set up exactly as the recorded game started. """
+        if self.tick_rate < 1:
+            raise ReplayError(f"tick rate {self.tick_rate}/s")
+        enemy_speed = self.tick_rate if self.mode == 'hard' else ENEMY_SPEED
+        game = Simulation(self.mode, seed=self.rng_seed, rows=self.rows, cols=self.cols,
+                          enemy_speed=enemy_speed, maze=replay_maze(self.rows, self.cols, self.maze_seed, self.braid))
+        if game.tick_rate != self.tick_rate:
+            raise ReplayError(f"{self.mode} games tick at {game.tick_rate}/s, the replay says {self.tick_rate}/s")
+        if game.enemy is not None:
+            game.enemy_script = self.enemy_moves()
+        return game
+
+
+@lru_cache(maxsize=64)
+def replay_maze(rows, cols, maze_seed, braid=0.0):
+    """ A replay's maze, rebuilt from its seed; cached because a daily or tournament board shares one maze. """
+    return generate_maze(rows, cols, seed=maze_seed, braid=braid)
+
+
+def verify(replay):
+    """ Re-simulates a replay headlessly and returns the result its inputs really produce.
+
+    The result is Simulation.result() plus the number of inputs. Raises
+    ReplayError for inputs no real game could contain, such as a tick
+    with more key presses than MAX_INPUTS_PER_SECOND allows (twice that
+    for friends mode's two players) or an input before the first tick, and
+    for an enemy that moved when it could not or strayed from its plans
+    more than MAX_ENEMY_DEVIATION allows.
+    """
+    game = replay.simulation()
+    inputs = replay.inputs()
+    per_tick = max(1, -(-MAX_INPUTS_PER_SECOND // replay.tick_rate)) * (2 if replay.mode == 'friends' else 1)
+    for tick, moves in inputs.items():
+        if tick < 1:
+            raise ReplayError(f"input at tick {tick}, before the game started")
+        if len(moves) > per_tick:
+            raise ReplayError(f"{len(moves)} inputs in tick {tick}, at most {per_tick} are possible")
+    last = max(replay.end_tick, max(inputs, default=0))
+    if last > MAX_GAME_SECONDS * replay.tick_rate:
+        raise ReplayError(f"{last} ticks is longer than {MAX_GAME_SECONDS}s")
+    while game.ticks < last and game.tick(inputs.get(game.ticks + 1)) == PLAYING:
+        pass
+    if game.enemy is not None:
+        if game.illegal_enemy_tick is not None:
+            raise ReplayError(f"enemy move in tick {game.illegal_enemy_tick} breaks the rules")
+        if game.enemy_script:
+            raise ReplayError(f"enemy move in tick {min(game.enemy_script)}, when the enemy had no turn")
+        if game.enemy_deviations > 1 + MAX_ENEMY_DEVIATION * game.enemy_decisions:
+            raise ReplayError(f"the enemy strayed from its plan in {game.enemy_deviations} "
+                              f"of {game.enemy_decisions} decisions")
+    result = game.result()
+    result['inputs'] = sum(1 for event in replay.events if event[1] != ENEMY_ACTOR)
+    return result
+
+
+def verify_file(path):
+    """ Worker entry point: (path, result, error message) for one replay file. """
+    try:
+        return path, verify(Replay.load(path)), None
+    except (OSError, ReplayError) as error:
+        return path, None, str(error)
+
+
+def verify_many(paths, processes=None):
+    """ Verifies replay files across a process pool, in the order given. """
+    with Pool(processes) as pool:
+        return pool.map(verify_file, paths, chunksize=max(1, len(paths) // 256))
+
+
+def play(replay, speed=1.0):
+    """ Shows a replay in a pygame window at `speed` times the pace it was played. """
+    import pygame
+    from entities import KEY, LOCK
+    from rendering import make_maze_layer
+
+    width, height, top_margin = 600, 650, 60
+    white, black = (240, 240, 240), (30, 30, 30)
+    green, red, blue, purple = (34, 177, 76), (237, 28, 36), (0, 162, 232), (128, 0, 128)
+    gold, grey = (255, 201, 14), (127, 127, 127)
+
+    game = replay.simulation()
+    inputs = replay.inputs()
+    last = max(replay.end_tick, max(inputs, default=0))
+    cell_size = max(width // replay.cols, 12)
+
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption(f"Maze Game - {replay.mode} replay x{speed:g}")
+    font = pygame.font.SysFont("Arial", 25, bold=True)
+    clock = pygame.time.Clock()
+    layer = make_maze_layer(game.maze, cell_size, top_margin, (width, height), white, black, white)
+
+    ended_at = None
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        if game.status == PLAYING and game.ticks < last:
+            game.tick(inputs.get(game.ticks + 1))
+        elif ended_at is None:
+            ended_at = time.perf_counter()
+        elif time.perf_counter() - ended_at > HOLD_SECONDS:
+            running = False
+
+        layer.follow(game.player)
+        layer.begin_frame(screen)
+        layer.rect(screen, green, layer.cell_rect(game.treasure), border_radius=8)
+        if game.mode == 'friends':
+            for key in game.entities.positions(KEY):
+                layer.rect(screen, gold, layer.cell_rect(key).inflate(-cell_size // 2, -cell_size // 2))
+            for lock in game.entities.positions(LOCK):
+                layer.rect(screen, grey, layer.cell_rect(lock), border_radius=4)
+            layer.rect(screen, blue, layer.cell_rect(game.player_blue), border_radius=10)
+        if game.enemy is not None:
+            layer.rect(screen, purple, layer.cell_rect(game.enemy), border_radius=10)
+        layer.rect(screen, red, layer.cell_rect(game.player), border_radius=10)
+        hud = f"Tick {game.ticks}/{last}  Moves: {game.moves}  x{speed:g}"
+        if game.status != PLAYING:
+            hud += f"  {game.status.upper()}"
+        layer.blit(screen, font.render(hud, True, black), (20, 15))
+        layer.present()
+        clock.tick(replay.tick_rate * speed)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify, inspect or watch game replays.")
+    parser.add_argument("command", choices=["verify", "info", "play"])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed multiplier")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    if args.command == "verify":
+        started = time.perf_counter()
+        results = verify_many(args.paths, args.processes)
+        elapsed = time.perf_counter() - started
+        for path, result, error in results:
+            if error:
+                print(f"{path}: INVALID {error}")
+            else:
+                print(f"{path}: {result['status']} moves={result['moves']} seconds={result['seconds']:.1f}")
+        print(f"Verified {len(results)} replays in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s)")
+    elif args.command == "info":
+        for path in args.paths:
+            replay = Replay.load(path)
+            print(f"{path}: {replay.mode} {replay.rows}x{replay.cols} maze_seed={replay.maze_seed} braid={replay.braid:g} "
+                  f"rng_seed={replay.rng_seed} events={len(replay.events)} ticks={replay.end_tick} "
+                  f"({replay.end_tick / replay.tick_rate:.1f}s) size={os.path.getsize(path)} bytes")
+    else:
+        for path in args.paths:
+            play(Replay.load(path), args.speed)
@@ -0,0 +1,97 @@
+""" Fixed-timestep scheduling for the game loops.
+
+The loop itself spins at loop_rate so keyboard input is polled with low
+latency, while each kind of work runs at its own fixed rate: enemy AI at
+the difficulty's tick rate, rendering at the display frame rate, and so
+on. Every pass adds the elapsed time to each task's accumulator and due()
+says how many fixed steps have come due since.
+
+    scheduler = FixedStepScheduler(loop_rate=120)
+    scheduler.add("enemy", ENEMY_SPEED)
+    scheduler.add("render", 60)
+    while running:
+        scheduler.begin_frame()
+        handle_input()
+        for _ in range(scheduler.due("enemy")):
+            move_enemy()
+        if scheduler.ready("render"):
+            draw()
+"""
+import time
+
+import pygame
+
+
+class FixedStepScheduler:
+    def __init__(self, loop_rate=120, max_catch_up=5):
+        self.loop_rate = loop_rate
+        # After a stall (a popup, a slow frame) at most this many steps are
+        # replayed per task instead of fast-forwarding through the backlog
+        self.max_catch_up = max_catch_up
+        self.clock = pygame.time.Clock()
+        self.rates = {}
+        self.accumulators = {}
+        self.now = None  # Time starts at the first begin_frame, not at construction
+
+    def add(self, name, rate):
+        """ Registers a task that should run `rate` times per second. """
+        self.rates[name] = rate
+        self.accumulators[name] = 0.0
+
+    def begin_frame(self):
+        """ Waits out the rest of this loop pass and accumulates the time that passed. """
+        self.clock.tick(self.loop_rate)
+        now = time.perf_counter()
+        elapsed = now - self.now if self.now is not None else 0.0
+        self.now = now
+        for name in self.accumulators:
+            self.accumulators[name] += elapsed
+        return elapsed
+
+    def due(self, name):
+        """ Fixed steps of `name` to run now; consumes them. """
+        step = 1 / self.rates[name]
+        steps = int(self.accumulators[name] // step)
+        if steps > self.max_catch_up:
+            self.accumulators[name] = 0.0
+            return self.max_catch_up
+        self.accumulators[name] -= steps * step
+        return steps
+
+    def ready(self, name):
+        """ True when at least one step is due; any backlog is dropped (use for rendering). """
+        step = 1 / self.rates[name]
+        if self.accumulators[name] < step:
+            return False
+        self.accumulators[name] %= step
+        return True
+
+
+class Tween:
+    """ A sprite sliding from cell to cell over `duration` seconds.
+
+    The game logic moves the cell instantly; pos() is only where to draw it,
+    so collisions are never judged on an in-between position.
+    """
+
+    def __init__(self, cell, duration):
+        self.cell = cell
+        self.duration = duration
+        self.start = (float(cell[0]), float(cell[1]))
+        self.started = 0.0
+
+    def move(self, cell, now):
+        if cell == self.cell:
+            return
+        # Start from where it is drawn now, so a move mid-slide does not jump
+        self.start = self.pos(now)
+        self.cell = cell
+        self.started = now
+
+    def pos(self, now):
+        """ Drawing position in (fractional) cells. """
+        t = (now - self.started) / self.duration if self.duration > 0 else 1.0
+        if t >= 1:
+            return (float(self.cell[0]), float(self.cell[1]))
+        return (self.start[0] + (self.cell[0] - self.start[0]) * t,
+                self.start[1] + (self.cell[1] - self.start[1]) * t)
@@ -1,8 +1,32 @@
-from flask import Flask, render_template, redirect, request
-import subprocess
+from flask import Flask, render_template, redirect, request, jsonify
+from sessions import GameSessionManager, SessionLimitError, WarmWorkerPool
 
 app = Flask(__name__)
 
+# Games run as background processes so no request waits for a window to close;
+# pre-warmed workers have pygame loaded already so the window opens quickly
+sessions = GameSessionManager(max_running=4, pool=WarmWorkerPool(size=2))
+
+MODE_NAMES = {
+    'classical': 'Classical Mode',
+    'easy': 'Enemy Easy Mode',
+    'hard': 'Enemy Hard Mode',
+    'friends': 'Play with Friends',
+    'swarm': 'Swarm Mode',
+}
+
+def start_game(mode):
+    """ Launches a game and answers immediately with its session id. """
+    try:
+        session_id = sessions.launch(mode)
+    except SessionLimitError as error:
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': str(error)}), 429
+        return render_template('running.html', mode=MODE_NAMES[mode], session_id=None, error=str(error)), 429
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'session_id': session_id}), 202
+    return redirect(f'/session/{session_id}')
+
 # Home Page
 @app.route('/')
 def home():
@@ -12,8 +36,7 @@ def home():
 @app.route('/friends_mode', methods=['GET', 'POST'])
 def friends_mode():
     if request.method == 'POST':
-        subprocess.run(['python', 'friends.py'])  # Run friends.py
-        return redirect('/')
+        return start_game('friends')  # Run friends.py
     return render_template('friends_mode.html')
 
 # Play with Computer → Show Mode Selection
@@ -24,20 +47,57 @@ def computer_mode():
 # Classical Mode → Runs classical.py
 @app.route('/run_classical', methods=['POST'])
 def run_classical():
-    subprocess.run(['python', 'classical.py'])  # Run classical.py
-    return redirect('/')
+    return start_game('classical')  # Run classical.py
 
 # Enemy Easy Mode → Runs easy_mode.py
 @app.route('/run_easy_mode', methods=['POST'])
 def run_easy_mode():
-    subprocess.run(['python', 'easy_mode.py'])  # Run easy_mode.py
-    return redirect('/')
+    return start_game('easy')  # Run easy_mode.py
 
 # Enemy Hard Mode → Runs hard_mode.py
 @app.route('/run_hard_mode', methods=['POST'])
 def run_hard_mode():
-    subprocess.run(['python', 'hard_mode.py'])  # Run hard_mode.py
-    return redirect('/')
+    return start_game('hard')  # Run hard_mode.py
+
+# Swarm Mode → Runs swarm_mode.py
+@app.route('/run_swarm_mode', methods=['POST'])
+def run_swarm_mode():
+    return start_game('swarm')  # Run swarm_mode.py
+
+# Session page → Shows a running game and polls its status
+@app.route('/session/<session_id>')
+def session_page(session_id):
+    status = sessions.status(session_id)
+    if status is None:
+        return redirect('/')
+    return render_template('running.html', mode=MODE_NAMES[status['mode']], session_id=session_id, error=None)
+
+# Session status → JSON state of one game
+@app.route('/sessions/<session_id>/status')
+def session_status(session_id):
+    status = sessions.status(session_id)
+    if status is None:
+        return jsonify({'error': 'unknown session'}), 404
+    return jsonify(status)
+
+# Session result → the game's own result (won/lost/quit, moves, seconds) once it has ended
+@app.route('/sessions/<session_id>/result')
+def session_result(session_id):
+    status = sessions.status(session_id)
+    if status is None:
+        return jsonify({'error': 'unknown session'}), 404
+    if status['state'] == 'running':
+        return jsonify(status), 202
+    if status['result'] is None:
+        # The game crashed or was killed before it could report
+        return jsonify(dict(status, error='the game ended without reporting a result')), 500
+    return jsonify(dict(status['result'], id=status['id'], state=status['state']))
+
+# All sessions → JSON list, newest last
+@app.route('/sessions')
+def session_list():
+    return jsonify(sessions.list())
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    sessions.pool.start()
+    app.run(debug=True, threaded=True)
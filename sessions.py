@@ -0,0 +1,244 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Game scripts the web front end can launch
+GAME_SCRIPTS = {
+    'classical': 'classical.py',
+    'easy': 'easy_mode.py',
+    'hard': 'hard_mode.py',
+    'friends': 'friends.py',
+    'swarm': 'swarm_mode.py',
+}
+
+RUNNING, FINISHED, FAILED = 'running', 'finished', 'failed'
+WON, LOST, QUIT = 'won', 'lost', 'quit'  # Game outcomes in a session result
+RESULT_FD_ENV = "MAZE_RESULT_FD"  # Pipe a launched game writes its result to
+
+
+def report_result(mode, status, moves, seconds, **extra):
+    """ Sends the finished game's result to the session that launched it; a no-op when run by hand.
+
+    The result is one JSON line on the pipe named by $MAZE_RESULT_FD. It is
+    written once, when the game ends, so the server only reads it after
+    the process has exited and never waits on it.
+    """
+    fd = os.environ.pop(RESULT_FD_ENV, None)
+    if fd is None:
+        return
+    result = dict(mode=mode, status=status, moves=moves, seconds=round(seconds, 2), **extra)
+    try:
+        with os.fdopen(int(fd), "w") as pipe:
+            pipe.write(json.dumps(result) + "\n")
+    except OSError:
+        pass  # The server has gone away; nobody is waiting for the result
+
+
+class SessionLimitError(Exception):
+    """ Raised when every game slot is busy. """
+
+
+class GameSession:
+    def __init__(self, mode, process, result_pipe=None):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.process = process
+        self.result_pipe = result_pipe  # Read end of the game's result pipe
+        self.started = time.time()
+        self.ended = None
+        self.returncode = None
+        self.result = None
+
+    @property
+    def state(self):
+        if self.returncode is None:
+            return RUNNING
+        return FINISHED if self.returncode == 0 else FAILED
+
+    def poll(self):
+        """ Records the exit code, and the game's result if it sent one, once the game process has ended. """
+        if self.returncode is None and self.process is not None:
+            code = self.process.poll()
+            if code is not None:
+                self.returncode = code
+                self.ended = time.time()
+                self.process = None  # Drop the handle so the OS entry is reaped
+                self.read_result()
+        return self.state
+
+    def read_result(self):
+        # The game has exited, so its end of the pipe is closed and this cannot block
+        if self.result_pipe is None:
+            return
+        try:
+            line = self.result_pipe.readline()
+            self.result = json.loads(line) if line.strip() else None
+        except (OSError, ValueError):
+            self.result = None
+        finally:
+            self.result_pipe.close()
+            self.result_pipe = None
+
+    def to_dict(self):
+        ended = self.ended if self.ended is not None else time.time()
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'state': self.state,
+            'returncode': self.returncode,
+            'seconds': round(ended - self.started, 2),
+            'result': self.result,
+        }
+
+
+def start_game(mode, base_dir):
+    """ Starts a game script in a new process with a pipe for its result; returns (process, result pipe). """
+    read_end, write_end = os.pipe()
+    env = dict(os.environ, **{RESULT_FD_ENV: str(write_end)})
+    try:
+        process = subprocess.Popen([sys.executable, GAME_SCRIPTS[mode]], cwd=base_dir, env=env, pass_fds=(write_end,))
+    except OSError:
+        os.close(read_end)
+        raise
+    finally:
+        os.close(write_end)  # Only the game holds the write end, so it reads as closed once the game exits
+    return process, os.fdopen(read_end)
+
+
+class WarmWorkerPool:
+    """ Keeps a few game_worker.py processes started and waiting for a mode.
+
+    Each worker has already imported pygame, initialised it, scanned fonts
+    and decoded the sprite atlas, so a launch only has to write the mode to
+    its stdin. The worker's stdout pipe then carries the game's result back
+    (see report_result). Used workers are replaced in the background.
+    """
+
+    def __init__(self, size=2, base_dir=None):
+        self.size = size
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.idle = []
+        self.lock = threading.Lock()
+        self.refilling = False
+
+    def spawn(self):
+        env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+        worker = subprocess.Popen([sys.executable, 'game_worker.py'], cwd=self.base_dir, env=env,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        # Wait for the worker to finish warming up before offering it
+        for line in worker.stdout:
+            if line.strip() == 'ready':
+                return worker
+        worker.wait()
+        return None
+
+    def start(self):
+        """ Fills the pool in the background. """
+        with self.lock:
+            if self.refilling:
+                return
+            self.refilling = True
+        threading.Thread(target=self.refill, daemon=True).start()
+
+    def refill(self):
+        try:
+            while True:
+                with self.lock:
+                    self.idle = [worker for worker in self.idle if worker.poll() is None]
+                    if len(self.idle) >= self.size:
+                        return
+                worker = self.spawn()
+                if worker is None:
+                    return  # Workers cannot start; launches fall back to cold starts
+                with self.lock:
+                    self.idle.append(worker)
+        finally:
+            with self.lock:
+                self.refilling = False
+
+    def acquire(self, mode):
+        """ Hands the mode to an idle worker (or a cold-started game); returns (process, result pipe). """
+        worker = None
+        with self.lock:
+            while self.idle and worker is None:
+                candidate = self.idle.pop(0)
+                if candidate.poll() is None:
+                    worker = candidate
+        self.start()
+        if worker is None:
+            return start_game(mode, self.base_dir)
+        worker.stdin.write(mode + '\n')
+        worker.stdin.close()
+        return worker, worker.stdout
+
+    def shutdown(self):
+        with self.lock:
+            for worker in self.idle:
+                worker.stdin.close()  # Workers exit when stdin closes without a mode
+            self.idle = []
+
+
+class GameSessionManager:
+    """ Launches game windows as background processes without blocking Flask.
+
+    launch() returns straight away with a session id; state and result are
+    polled later. At most max_running games run at once, and finished
+    sessions are kept (up to keep_finished) so their result can be read.
+    With a WarmWorkerPool, games start in pre-warmed processes.
+    """
+
+    def __init__(self, max_running=4, keep_finished=100, base_dir=None, pool=None):
+        self.max_running = max_running
+        self.pool = pool
+        self.keep_finished = keep_finished
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def reap(self):
+        """ Polls running games and forgets the oldest finished ones. """
+        finished = []
+        for session in self.sessions.values():
+            if session.poll() != RUNNING:
+                finished.append(session.id)
+        for session_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.sessions[session_id]
+
+    def running_count(self):
+        return sum(1 for session in self.sessions.values() if session.state == RUNNING)
+
+    def launch(self, mode):
+        if mode not in GAME_SCRIPTS:
+            raise KeyError(mode)
+        with self.lock:
+            self.reap()
+            if self.running_count() >= self.max_running:
+                raise SessionLimitError(f"{self.max_running} games are already running")
+            process, result_pipe = self.start_process(mode)
+            session = GameSession(mode, process, result_pipe)
+            self.sessions[session.id] = session
+            return session.id
+
+    def start_process(self, mode):
+        if self.pool is not None:
+            return self.pool.acquire(mode)
+        return start_game(mode, self.base_dir)
+
+    def get(self, session_id):
+        with self.lock:
+            self.reap()
+            return self.sessions.get(session_id)
+
+    def status(self, session_id):
+        session = self.get(session_id)
+        return session.to_dict() if session else None
+
+    def list(self):
+        with self.lock:
+            self.reap()
+            return [session.to_dict() for session in self.sessions.values()]
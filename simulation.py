@@ -0,0 +1,310 @@
+""" Headless game rules for bulk simulation.
+
+Mirrors the rules of the pygame modes (classical, easy, hard and friends)
+without SDL, a clock or a window: a game advances one tick at a time from
+a list of inputs, so thousands of seeded games can be played by bots on a
+process pool to tune ENEMY_SPEED, RANDOM_MOVE_CHANCE and player_headstart.
+"""
+import argparse
+import json
+import random
+from multiprocessing import Pool
+
+from maze import DIRECTIONS, generate_maze
+from pathfinding import DistanceField, PursuitPath, shortest_path
+from keylock import place_keys_and_locks
+from entities import EntityGrid, KEY, LOCK
+
+MOVES = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
+
+PLAYING, WON, LOST = 'playing', 'won', 'lost'
+
+# Defaults taken from the game modules
+ROWS, COLS = 21, 21
+ENEMY_SPEED = 5  # hard_mode.py enemy tick rate, one enemy decision per tick
+RANDOM_MOVE_CHANCE = 0.2
+PLAYER_HEADSTART = 7
+EASY_FPS = 10
+EASY_ENEMY_DELAY = 3  # seconds between easy mode enemy steps
+
+
+class Simulation:
+    """ One game in progress. tick() applies the inputs for a single frame.
+
+    Inputs are move letters from MOVES; in friends mode a tick takes a
+    (red_move, blue_move) pair and either may be None. A list of inputs
+    is applied in order within the one tick, as when several keys are
+    pressed between two frames. Reaching the treasure or the enemy ends
+    the game at once, before any later input or enemy step.
+
+    enemy_script, when set to {tick: (dx, dy)}, moves the enemy as a
+    recorded game did instead of by the simulation's own plan. Each
+    scripted chase step is compared with the plan, and enemy_deviations
+    counts those that fit neither it nor any other shortest chase step.
+    Random moves depend only on the seed, so a scripted one that differs,
+    or any step into a wall, sets illegal_enemy_tick instead.
+    """
+
+    def __init__(self, mode='hard', seed=None, rows=ROWS, cols=COLS, enemy_speed=ENEMY_SPEED,
+                 random_move_chance=RANDOM_MOVE_CHANCE, player_headstart=PLAYER_HEADSTART, maze=None, braid=0.0):
+        self.mode = mode
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # A given maze (as a live game has, from its own maze seed) leaves
+        # seed to drive only enemy and key placement randomness
+        self.maze = maze if maze is not None else generate_maze(rows, cols, rng=self.rng, braid=braid)
+        self.rows, self.cols = rows, cols
+        self.treasure = (rows - 2, cols - 2)
+        self.player = (1, 1)
+        self.moves = 0
+        self.ticks = 0
+        self.status = PLAYING
+        self.tick_rate = enemy_speed if mode == 'hard' else EASY_FPS
+        self.random_move_chance = random_move_chance
+        self.player_headstart = player_headstart
+        self.enemy = None
+        self.enemy_moves = 0
+        self.enemy_script = None
+        self.enemy_decisions = 0
+        self.enemy_deviations = 0
+        self.illegal_enemy_tick = None
+
+        if mode == 'hard':
+            patrol_area = [(3, 3), (3, cols - 4), (rows - 4, cols - 4), (rows - 4, 3)]
+            self.enemy = self.maze.nearest_open(*self.rng.choice(patrol_area))
+        elif mode == 'easy':
+            self.enemy = self.maze.nearest_open(rows - 4, cols - 4)
+            self.enemy_interval = EASY_ENEMY_DELAY * EASY_FPS
+        elif mode == 'friends':
+            self.player_blue = (1, cols - 2)
+            self.blue_moves = 0
+            self.keys_held = {'red': 0, 'blue': 0}
+            keys, locks = place_keys_and_locks(self.maze, [self.player, self.player_blue],
+                                               self.treasure, 2, 2, rng=self.rng)
+            self.entities = EntityGrid.for_maze(self.maze)
+            self.entities.add_all(KEY, keys)
+            self.entities.add_all(LOCK, locks)
+        if self.enemy is not None:
+            self.pursuit = PursuitPath(self.maze, self.enemy, self.player)
+
+    @property
+    def seconds(self):
+        return self.ticks / self.tick_rate
+
+    def tick(self, move=None):
+        """ Advances one frame; returns the game status afterwards. """
+        if self.status != PLAYING:
+            return self.status
+        self.ticks += 1
+        for single in (move if isinstance(move, list) else [move]):
+            if self.apply_input(single) != PLAYING:
+                return self.status
+        if self.mode == 'friends':
+            return self.status
+
+        if self.mode == 'hard':
+            if self.moves > self.player_headstart and self.moves % 5 == 0:
+                self.hard_enemy_step()
+        elif self.mode == 'easy':
+            if self.ticks % self.enemy_interval == 0:
+                self.easy_enemy_step()
+        self.check_status()
+        return self.status
+
+    def apply_input(self, move):
+        """ One player input, judged immediately. """
+        if self.mode == 'friends':
+            red_move, blue_move = move if move else (None, None)
+            self.player = self.friends_move(self.player, red_move, 'red')
+            self.player_blue = self.friends_move(self.player_blue, blue_move, 'blue')
+            if self.player == self.treasure or self.player_blue == self.treasure:
+                self.status = WON
+            return self.status
+
+        if move:
+            dx, dy = MOVES[move]
+            if self.maze.is_open(self.player[0] + dx, self.player[1] + dy):
+                self.player = (self.player[0] + dx, self.player[1] + dy)
+                self.moves += 1
+                if self.enemy is not None:
+                    self.pursuit.target_moved(self.player)
+        return self.check_status()
+
+    def check_status(self):
+        if self.player == self.treasure:
+            self.status = WON
+        elif self.player == self.enemy:
+            self.status = LOST
+        return self.status
+
+    def hard_enemy_step(self):
+        if self.rng.random() < self.random_move_chance:
+            directions = DIRECTIONS[:]
+            self.rng.shuffle(directions)
+            for dx, dy in directions:
+                next_pos = (self.enemy[0] + dx, self.enemy[1] + dy)
+                if self.maze.is_open(*next_pos):
+                    self.move_enemy(next_pos, chasing=False)
+                    return
+        self.move_enemy(self.pursuit.path[1] if len(self.pursuit.path) > 2 else self.enemy)
+        self.enemy_moves += 1
+
+    def easy_enemy_step(self):
+        next_cell = self.pursuit.next_step()
+        if self.move_enemy(next_cell or self.enemy):
+            self.enemy_moves += 1
+
+    def move_enemy(self, planned, chasing=True):
+        """ Moves the enemy to `planned`, or as enemy_script says when set; True if it moved. """
+        cell = planned
+        if self.enemy_script is not None:
+            self.enemy_decisions += 1
+            step = self.enemy_script.pop(self.ticks, None)
+            cell = self.enemy if step is None else (self.enemy[0] + step[0], self.enemy[1] + step[1])
+            if (step is not None and not self.maze.is_open(*cell)) or (cell != planned and not chasing):
+                if self.illegal_enemy_tick is None:
+                    self.illegal_enemy_tick = self.ticks
+                cell = planned
+            elif cell != planned and not self.chase_step(cell):
+                self.enemy_deviations += 1
+        if cell == self.enemy:
+            return False
+        self.enemy = cell
+        self.pursuit.hunter_moved(cell)
+        return True
+
+    def chase_step(self, cell):
+        """ True if stepping the enemy to cell is a move along some shortest path to the player. """
+        return len(shortest_path(self.maze, cell, self.player)) == len(shortest_path(self.maze, self.enemy, self.player)) - 1
+
+    def friends_move(self, position, move, player):
+        if not move:
+            return position
+        dx, dy = MOVES[move]
+        new_pos = (position[0] + dx, position[1] + dy)
+        if self.entities.take(KEY, new_pos):
+            self.keys_held[player] += 1
+        if self.entities.has(LOCK, new_pos):
+            if self.keys_held[player] == 0:
+                return position
+            self.keys_held[player] -= 1
+            self.entities.remove(LOCK, new_pos)
+        if not self.maze.is_open(*new_pos):
+            return position
+        if player == 'red':
+            self.moves += 1
+        else:
+            self.blue_moves += 1
+        return new_pos
+
+    def result(self):
+        return {
+            'seed': self.seed,
+            'mode': self.mode,
+            'status': self.status,
+            'ticks': self.ticks,
+            'seconds': self.seconds,
+            'moves': self.moves,
+            'enemy_moves': self.enemy_moves,
+        }
+
+
+def run_inputs(inputs, max_ticks=None, **config):
+    """ Plays a fixed input sequence (one entry per tick) and returns the result. """
+    game = Simulation(**config)
+    for move in inputs:
+        if game.tick(move) != PLAYING:
+            break
+    else:
+        while max_ticks and game.ticks < max_ticks and game.tick() == PLAYING:
+            pass
+    return game.result()
+
+
+def direction_letter(step):
+    for letter, delta in MOVES.items():
+        if delta == step:
+            return letter
+    return None
+
+
+class GreedyBot:
+    """ Walks the shortest route to the treasure, at a human-like pace and with mistakes. """
+
+    def __init__(self, game, moves_per_second=4.0, mistake_chance=0.1, seed=None):
+        self.game = game
+        self.rng = random.Random(seed)
+        self.move_chance = min(1.0, moves_per_second / game.tick_rate)
+        self.mistake_chance = mistake_chance
+        self.field = DistanceField(game.maze, game.treasure)
+
+    def next_input(self):
+        if self.rng.random() >= self.move_chance:
+            return None
+        if self.rng.random() < self.mistake_chance:
+            return self.rng.choice(list(MOVES))
+        return direction_letter(self.field.direction(self.game.player))
+
+    def next_inputs(self):
+        """ Friends mode: both players use the same bot logic. """
+        red = self.next_input()
+        step = self.field.direction(self.game.player_blue)
+        blue = direction_letter(step) if self.rng.random() < self.move_chance else None
+        return (red, blue)
+
+
+def play_bot_game(job):
+    """ Worker entry point: one seeded game played by GreedyBot. """
+    seed, config, bot_options, max_ticks = job
+    game = Simulation(seed=seed, **config)
+    bot = GreedyBot(game, seed=seed, **bot_options)
+    next_input = bot.next_inputs if game.mode == 'friends' else bot.next_input
+    while game.status == PLAYING and game.ticks < max_ticks:
+        game.tick(next_input())
+    return game.result()
+
+
+def run_batch(games, config=None, bot_options=None, first_seed=0, processes=None, max_ticks=5000):
+    """ Plays `games` seeded bot games across a process pool and summarises them. """
+    config = config or {}
+    bot_options = bot_options or {}
+    jobs = [(seed, config, bot_options, max_ticks) for seed in range(first_seed, first_seed + games)]
+    with Pool(processes) as pool:
+        results = pool.map(play_bot_game, jobs, chunksize=max(1, games // 256))
+    return summarise(results)
+
+
+def summarise(results):
+    wins = [r for r in results if r['status'] == WON]
+    losses = [r for r in results if r['status'] == LOST]
+    return {
+        'games': len(results),
+        'win_rate': len(wins) / len(results) if results else 0.0,
+        'loss_rate': len(losses) / len(results) if results else 0.0,
+        'timeout_rate': (len(results) - len(wins) - len(losses)) / len(results) if results else 0.0,
+        'mean_win_seconds': sum(r['seconds'] for r in wins) / len(wins) if wins else None,
+        'mean_moves': sum(r['moves'] for r in results) / len(results) if results else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run bot games headlessly to tune difficulty.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--mode", choices=["classical", "easy", "hard", "friends"], default="hard")
+    parser.add_argument("--enemy-speed", type=int, default=ENEMY_SPEED)
+    parser.add_argument("--random-move-chance", type=float, default=RANDOM_MOVE_CHANCE)
+    parser.add_argument("--headstart", type=int, default=PLAYER_HEADSTART)
+    parser.add_argument("--braid", type=float, default=0.0, help="fraction of dead ends to open into loops")
+    parser.add_argument("--moves-per-second", type=float, default=4.0)
+    parser.add_argument("--mistake-chance", type=float, default=0.1)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    summary = run_batch(
+        args.games,
+        config={'mode': args.mode, 'enemy_speed': args.enemy_speed,
+                'random_move_chance': args.random_move_chance, 'player_headstart': args.headstart,
+                'braid': args.braid},
+        bot_options={'moves_per_second': args.moves_per_second, 'mistake_chance': args.mistake_chance},
+        processes=args.processes,
+    )
+    print(json.dumps(summary, indent=2))
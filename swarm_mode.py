@@ -0,0 +1,132 @@
+import pygame
+import random
+import time
+from maze_bank import choose_maze, maze_size
+from rendering import make_maze_layer
+from assets import atlas
+from enemy_ai import EnemySwarm
+from entities import EntityGrid, TREASURE
+from profiler import frame_profiler
+from scheduler import FixedStepScheduler, Tween
+from sessions import report_result, WON, LOST, QUIT
+
+# Constants
+WIDTH, HEIGHT = 600, 650  # Space for UI
+ROWS = COLS = maze_size(41)  # Bigger maze so the swarm has room to spread
+MIN_CELL_SIZE = 14  # Mazes that would need smaller cells scroll instead
+CELL_SIZE = max(WIDTH // COLS, MIN_CELL_SIZE)
+TOP_MARGIN = 60  # Space for UI elements
+
+# Colors
+WHITE = (240, 240, 240)
+BLACK = (30, 30, 30)
+
+# Initialize Pygame
+pygame.init()
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+pygame.display.set_caption("Maze Game - Escape the Swarm!")
+profiler = frame_profiler("swarm")  # Off unless $MAZE_PROFILE is set
+font = pygame.font.SysFont("Arial", 30, bold=True)
+
+# Images with slightly larger scaling (1.2x original size)
+girl_img = atlas.sprite("girl-1.png", (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
+treasure_img = atlas.sprite("treasure.png", (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
+enemy_img = atlas.sprite("enemy.png", (int(CELL_SIZE * 1.2), int(CELL_SIZE * 1.2)))
+
+# Swarm difficulty
+ENEMY_COUNT = 40
+ENEMY_SPEED = 2.5  # Swarm steps per second
+SAFE_DISTANCE = 20  # Enemies spawn at least this many moves from the player
+RANDOM_MOVE_CHANCE = 0.2
+PLAYER_HEADSTART = 5
+
+# Input is polled every loop pass; AI and drawing run at their own fixed rates
+LOOP_RATE = 120
+RENDER_FPS = 60
+scheduler = FixedStepScheduler(LOOP_RATE)
+scheduler.add("enemy", ENEMY_SPEED)
+scheduler.add("render", RENDER_FPS)
+
+def show_popup(message):
+    popup = pygame.Surface((400, 200))
+    popup.fill(WHITE)
+    pygame.draw.rect(popup, BLACK, popup.get_rect(), 5)
+    text = font.render(message, True, BLACK)
+    popup.blit(text, (50, 80))
+    screen.blit(popup, (100, 200))
+    pygame.display.flip()
+    time.sleep(3)
+
+def sprite_pos(cell):
+    # Center the larger image on its (possibly fractional) cell
+    return (int(cell[1] * CELL_SIZE) - int(CELL_SIZE * 0.1), int(cell[0] * CELL_SIZE) + TOP_MARGIN - int(CELL_SIZE * 0.1))
+
+def draw_maze():
+    # Walls and treasure come from the cached layer; only sprites and HUD are redrawn
+    maze_layer.follow(player)
+    maze_layer.begin_frame(screen)
+    for tween in enemy_tweens:
+        maze_layer.blit_world(screen, enemy_img, sprite_pos(tween.pos(scheduler.now)))
+    maze_layer.blit_world(screen, girl_img, sprite_pos(player))
+    move_text = font.render(f"Moves: {moves}  Time: {int(time.time() - start_time)}s  Enemies: {len(swarm.enemies)}", True, BLACK)
+    maze_layer.blit(screen, move_text, (20, 15))
+
+maze = choose_maze(ROWS, COLS)
+treasure = (ROWS - 2, COLS - 2)
+player = (1, 1)
+moves = 0
+entities = EntityGrid.for_maze(maze)
+entities.add(TREASURE, treasure)
+swarm = EnemySwarm(maze, [], player, RANDOM_MOVE_CHANCE, entities=entities)
+# Spawn anywhere far enough from the player, using the swarm's own distance field
+spawn_cells = [cell for cell in maze.open_cells() if SAFE_DISTANCE <= swarm.field.distance(cell) < float('inf') and cell != treasure]
+swarm.spawn(random.sample(spawn_cells, min(ENEMY_COUNT, len(spawn_cells))))
+enemy_tweens = [Tween(enemy, 1 / ENEMY_SPEED) for enemy in swarm.enemies]
+maze_layer = make_maze_layer(maze, CELL_SIZE, TOP_MARGIN, (WIDTH, HEIGHT), WHITE, BLACK, WHITE)
+maze_layer.bake(treasure_img, sprite_pos(treasure))
+start_time = time.time()
+end_time = None  # Set when the game is won or lost
+
+running = True
+while running:
+    profiler.begin_frame()
+    scheduler.begin_frame()
+    profiler.mark("wait")
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            running = False
+        elif event.type == pygame.KEYDOWN:
+            dx, dy = {pygame.K_UP: (-1, 0), pygame.K_DOWN: (1, 0), pygame.K_LEFT: (0, -1), pygame.K_RIGHT: (0, 1)}.get(event.key, (0, 0))
+            if maze.is_open(player[0] + dx, player[1] + dy):
+                player = (player[0] + dx, player[1] + dy)
+                swarm.player_moved(player)
+                moves += 1
+    profiler.mark("input")
+
+    # One flow field for the whole swarm, rebuilt only if the player has moved
+    for _ in range(scheduler.due("enemy")):
+        if moves > PLAYER_HEADSTART and not swarm.caught():
+            swarm.step()
+            for tween, enemy in zip(enemy_tweens, swarm.enemies):
+                tween.move(enemy, scheduler.now)
+    profiler.mark("enemy")
+
+    if entities.has(TREASURE, player):
+        end_time = time.time()
+        show_popup(f"You Won! Time: {int(end_time - start_time)}s")
+        running = False
+    elif swarm.caught():
+        end_time = time.time()
+        show_popup("Caught by the swarm!")
+        running = False
+
+    if scheduler.ready("render"):
+        draw_maze()
+        profiler.draw_overlay(screen, maze_layer)
+        profiler.mark("draw")
+        maze_layer.present()
+        profiler.mark("present")
+
+pygame.quit()
+status = QUIT if end_time is None else WON if entities.has(TREASURE, player) else LOST
+report_result("swarm", status, moves, (end_time or time.time()) - start_time)